@@ -0,0 +1,63 @@
+"""
+Cache Invalidation Helpers
+Version counters that write endpoints bump so cached reads go stale at once.
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from cachetools import TTLCache
+
+
+# scope -> monotonically increasing data version (per process)
+_versions: Dict[str, int] = defaultdict(int)
+
+
+def data_version(scope: str) -> int:
+    """
+    Current data version for a scope.
+    
+    Include it in cache keys so that entries computed before the last
+    write are never served again.
+    """
+    return _versions[scope]
+
+
+def bump_data_version(scope: str) -> int:
+    """Invalidate cached reads for a scope after a write"""
+    _versions[scope] += 1
+    return _versions[scope]
+
+
+class ResultCache:
+    """
+    TTL cache for computed read results, invalidated by a data version scope.
+    
+    Concurrent misses on the same key wait on a per-key lock so only the
+    first request recomputes; the rest pick up its result. Keys carry the
+    scope's data version, so bump_data_version(scope) invalidates them.
+    """
+    
+    def __init__(self, scope: str, maxsize: int, ttl: float):
+        self.scope = scope
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._locks: Dict[Tuple, asyncio.Lock] = defaultdict(asyncio.Lock)
+    
+    async def get_or_compute(self, key: Tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached result for key, computing it at most once per TTL"""
+        key = key + (data_version(self.scope),)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            async with self._locks[key]:
+                cached = self._cache.get(key)
+                if cached is None:
+                    cached = await compute()
+                    self._cache[key] = cached
+                return cached
+        finally:
+            # Also when compute() raises, so failing keys don't leak locks
+            self._locks.pop(key, None)
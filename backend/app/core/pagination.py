@@ -0,0 +1,30 @@
+"""
+Keyset Pagination Helpers
+Opaque cursors that let list endpoints seek past the last row of a page.
+"""
+
+import base64
+import binascii
+from typing import Any, Callable, Sequence, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque cursor for the sort key of the last row on a page"""
+    return base64.urlsafe_b64encode("|".join(str(value) for value in values).encode()).decode()
+
+
+def decode_cursor(cursor: str, types: Sequence[Callable[[str], Any]]) -> Tuple:
+    """
+    Sort key values from a cursor made by encode_cursor, converted with types.
+    
+    Raises a 400 for cursors that don't decode to one value per type.
+    """
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if len(parts) != len(types):
+            raise ValueError(cursor)
+        return tuple(convert(part) for convert, part in zip(types, parts))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
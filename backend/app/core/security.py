@@ -4,17 +4,32 @@ Implements rate limiting, CORS, and security headers for production.
 """
 
 import os
+import asyncio
+import threading
 from functools import wraps
-from time import time
-from collections import defaultdict
-from typing import Callable
+from time import monotonic
+from typing import Callable, Dict, List, Optional, Tuple
 from fastapi import Request, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 
 # Rate limiting storage (in-memory, use Redis in production)
-_rate_limit_storage = defaultdict(list)
+# client IP -> (tokens, last_refill) token bucket, sharded by IP hash so
+# concurrent requests from different clients rarely share a lock
+_RATE_LIMIT_SHARDS = 64
+_rate_limit_storage: List[Dict[str, Tuple[float, float]]] = [{} for _ in range(_RATE_LIMIT_SHARDS)]
+_rate_limit_locks: List[threading.Lock] = [threading.Lock() for _ in range(_RATE_LIMIT_SHARDS)]
+_rate_limit_sweeper: Optional[asyncio.Task] = None
+
+# Security headers are fixed for the process lifetime
+_IS_PRODUCTION = os.getenv("DEBUG", "true").lower() != "true"
+_HSTS_VALUE = "max-age=31536000; includeSubDomains"
+_STATIC_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+}
 
 
 def setup_cors(app):
@@ -41,40 +56,70 @@ def setup_cors(app):
     print(f"[CORS] Configured for origins: {allowed_origins}")
 
 
+def _sweep_rate_limit_storage(idle_seconds: float):
+    """Drop buckets that have been idle long enough to be full again"""
+    cutoff = monotonic() - idle_seconds
+    for shard, lock in zip(_rate_limit_storage, _rate_limit_locks):
+        with lock:
+            stale = [ip for ip, (_, last) in shard.items() if last < cutoff]
+            for ip in stale:
+                del shard[ip]
+
+
+async def _rate_limit_sweep_loop(idle_seconds: float):
+    """Background task keeping the bucket map bounded"""
+    while True:
+        await asyncio.sleep(idle_seconds)
+        _sweep_rate_limit_storage(idle_seconds)
+
+
+def _ensure_rate_limit_sweeper(idle_seconds: float):
+    """Start the sweeper once, on the running event loop"""
+    global _rate_limit_sweeper
+    if _rate_limit_sweeper is None or _rate_limit_sweeper.done():
+        _rate_limit_sweeper = asyncio.create_task(_rate_limit_sweep_loop(idle_seconds))
+
+
 def rate_limit(max_requests: int = 10, window_seconds: int = 60):
     """
     Rate limiting decorator for FastAPI routes.
     
-    Limits requests per IP address within a time window.
+    Token bucket per IP address: holds up to max_requests tokens and
+    refills at max_requests / window_seconds tokens per second, so each
+    request is O(1) and only two floats are stored per client.
     
     Args:
         max_requests: Maximum number of requests allowed
         window_seconds: Time window in seconds
     """
+    refill_rate = max_requests / window_seconds
+    
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(request: Request, *args, **kwargs):
             # Get client IP
             client_ip = request.client.host if request.client else "unknown"
             
-            # Get current time
-            current_time = time()
-            
-            # Clean old entries for this IP
-            _rate_limit_storage[client_ip] = [
-                req_time for req_time in _rate_limit_storage[client_ip]
-                if current_time - req_time < window_seconds
-            ]
+            _ensure_rate_limit_sweeper(2 * window_seconds)
             
-            # Check if limit exceeded
-            if len(_rate_limit_storage[client_ip]) >= max_requests:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Rate limit exceeded. Max {max_requests} requests per {window_seconds} seconds."
-                )
+            index = hash(client_ip) & (_RATE_LIMIT_SHARDS - 1)
+            shard = _rate_limit_storage[index]
             
-            # Record this request
-            _rate_limit_storage[client_ip].append(current_time)
+            now = monotonic()
+            with _rate_limit_locks[index]:
+                tokens, last_refill = shard.get(client_ip, (max_requests, now))
+                tokens = min(max_requests, tokens + (now - last_refill) * refill_rate)
+                
+                # Check if limit exceeded
+                if tokens < 1:
+                    shard[client_ip] = (tokens, now)
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail=f"Rate limit exceeded. Max {max_requests} requests per {window_seconds} seconds."
+                    )
+                
+                # Record this request
+                shard[client_ip] = (tokens - 1, now)
             
             # Call the actual function
             return await func(request, *args, **kwargs)
@@ -98,14 +143,11 @@ def add_security_headers(app):
         response = await call_next(request)
         
         # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers.update(_STATIC_HEADERS)
         
         # HSTS (only in production with HTTPS)
-        is_production = os.getenv("DEBUG", "true").lower() != "true"
-        if is_production:
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        if _IS_PRODUCTION:
+            response.headers["Strict-Transport-Security"] = _HSTS_VALUE
         
         return response
     
@@ -7,10 +7,16 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 
+from database import Database, get_db
+from ..core.cache import ResultCache
 from ..services.analytics import calculate_summary_metrics, get_cashflow_predictions
 
 router = APIRouter(prefix="/api/finance", tags=["analytics"])
 
+# Analytics are MTD-granularity, so results are stable for well over a minute;
+# recording a transaction bumps the "analytics" version and invalidates them
+_ANALYTICS_CACHE = ResultCache("analytics", maxsize=256, ttl=60)
+
 
 class AnalyticsResponse(BaseModel):
     """Analytics response model"""
@@ -21,7 +27,8 @@ class AnalyticsResponse(BaseModel):
 @router.get("/analytics", response_model=AnalyticsResponse)
 async def get_analytics(
     entity_id: Optional[int] = None,
-    horizon: int = 3
+    horizon: int = 3,
+    db: Database = Depends(get_db)
 ):
     """
     Get financial analytics including summary metrics and predictions.
@@ -57,16 +64,19 @@ async def get_analytics(
     ```
     """
     try:
-        # Calculate summary metrics
-        summary = calculate_summary_metrics(entity_id)
-        
-        # Generate predictions
-        predictions = get_cashflow_predictions(horizon_months=horizon)
+        async def compute() -> AnalyticsResponse:
+            # Calculate summary metrics
+            summary = await calculate_summary_metrics(db, entity_id)
+            
+            # Generate predictions
+            predictions = await get_cashflow_predictions(db, horizon_months=horizon)
+            
+            return AnalyticsResponse(
+                summary=summary,
+                predictions=predictions
+            )
         
-        return AnalyticsResponse(
-            summary=summary,
-            predictions=predictions
-        )
+        return await _ANALYTICS_CACHE.get_or_compute(("analytics", entity_id, horizon), compute)
         
     except Exception as e:
         raise HTTPException(
@@ -76,7 +86,7 @@ async def get_analytics(
 
 
 @router.get("/predict/cashflow")
-async def predict_cashflow(horizon: int = 12):
+async def predict_cashflow(horizon: int = 12, db: Database = Depends(get_db)):
     """
     Get cashflow predictions only.
     
@@ -93,7 +103,10 @@ async def predict_cashflow(horizon: int = 12):
         )
     
     try:
-        predictions = get_cashflow_predictions(horizon_months=horizon)
+        predictions = await _ANALYTICS_CACHE.get_or_compute(
+            ("predictions", horizon),
+            lambda: get_cashflow_predictions(db, horizon_months=horizon)
+        )
         return {
             "predictions": predictions,
             "horizon_months": horizon,
@@ -107,15 +120,17 @@ async def predict_cashflow(horizon: int = 12):
 
 
 @router.get("/metrics/summary")
-async def get_summary_metrics(entity_id: Optional[int] = None):
+async def get_summary_metrics(entity_id: Optional[int] = None, db: Database = Depends(get_db)):
     """
     Get summary metrics only (no predictions).
     
     Faster endpoint for dashboard overview.
     """
     try:
-        summary = calculate_summary_metrics(entity_id)
-        return summary
+        return await _ANALYTICS_CACHE.get_or_compute(
+            ("summary", entity_id),
+            lambda: calculate_summary_metrics(db, entity_id)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -33,7 +33,8 @@ from ..services.external_apis import (
     generate_random_users,
     get_air_quality,
     get_ip_geolocation,
-    calculate_carbon_footprint
+    calculate_carbon_footprint,
+    served_stale
 )
 
 router = APIRouter(prefix="/api/external", tags=["external-data"])
@@ -53,13 +54,13 @@ async def fetch_exchange_rates(
     Example: `/api/external/exchange-rates?base=USD&symbols=KES,EUR,GBP,NGN`
     """
     try:
-        symbol_list = symbols.split(",") if symbols else ["KES", "EUR", "GBP", "NGN", "TZS", "UGX"]
-        rates = await get_exchange_rates(base, symbol_list)
+        rates = await get_exchange_rates(base, symbols.split(",") if symbols else None)
         
         return {
             "base": base,
             "rates": rates,
-            "source": "exchangerate.host"
+            "source": "exchangerate.host",
+            "stale": served_stale()
         }
     except Exception as e:
         raise HTTPException(
@@ -77,7 +78,7 @@ async def fetch_crypto_price(
     Get cryptocurrency price.
     
     Source: CoinGecko (free, no API key required)
-    Cache: 5 minutes
+    Cache: 1 minute
     
     Common coin_id values: bitcoin, ethereum, cardano, solana
     
@@ -96,7 +97,8 @@ async def fetch_crypto_price(
             "coin_id": coin_id,
             "price": price,
             "currency": vs_currency,
-            "source": "coingecko.com"
+            "source": "coingecko.com",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -133,7 +135,8 @@ async def fetch_weather(
         return {
             "location": {"latitude": latitude, "longitude": longitude},
             "weather": weather,
-            "source": "open-meteo.com"
+            "source": "open-meteo.com",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -168,7 +171,8 @@ async def geocode(
         return {
             "query": address,
             "location": location,
-            "source": "openstreetmap.org"
+            "source": "openstreetmap.org",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -213,7 +217,8 @@ async def fetch_macro_indicator(
             "indicator": indicator,
             "date_range": f"{date_start or 'all'} to {date_end or 'latest'}",
             "data": data,
-            "source": "worldbank.org"
+            "source": "worldbank.org",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -249,7 +254,8 @@ async def fetch_country_info(country_name: str):
         
         return {
             "country": info,
-            "source": "restcountries.com"
+            "source": "restcountries.com",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -287,7 +293,8 @@ async def fetch_public_holidays(
             "year": year,
             "holidays": holidays,
             "count": len(holidays),
-            "source": "date.nager.at"
+            "source": "date.nager.at",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -319,7 +326,8 @@ async def fetch_book_by_isbn(isbn: str):
         
         return {
             "book": book,
-            "source": "openlibrary.org"
+            "source": "openlibrary.org",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -356,7 +364,8 @@ async def search_for_books(
             "query": q,
             "results": books,
             "count": len(books),
-            "source": "openlibrary.org"
+            "source": "openlibrary.org",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -393,7 +402,8 @@ async def generate_demo_users(
             "users": users,
             "count": len(users),
             "nationality": nationality,
-            "source": "randomuser.me"
+            "source": "randomuser.me",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -430,7 +440,8 @@ async def fetch_air_quality(
             "country_code": country_code,
             "measurements": data,
             "count": len(data),
-            "source": "openaq.org"
+            "source": "openaq.org",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -462,7 +473,8 @@ async def fetch_geolocation():
         
         return {
             "location": location,
-            "source": "ipapi.co"
+            "source": "ipapi.co",
+            "stale": served_stale()
         }
     except HTTPException:
         raise
@@ -489,12 +501,7 @@ async def calculate_carbon(
     Example: `/api/external/carbon-footprint?electricity_kwh=1000&fuel_liters=50&flights_km=5000`
     """
     try:
-        result = calculate_carbon_footprint(
-            electricity_kwh=electricity_kwh,
-            natural_gas_therms=natural_gas_therms,
-            fuel_liters=fuel_liters,
-            flights_km=flights_km
-        )
+        result = calculate_carbon_footprint(electricity_kwh, natural_gas_therms, fuel_liters, flights_km)
         
         return {
             "footprint": result,
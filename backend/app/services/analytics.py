@@ -3,21 +3,37 @@ Finance Analytics Service
 Provides summary metrics, trend analysis, and ML-powered predictions.
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import sqlite3
-import os
 
+import numpy as np
 
-def get_db_connection():
-    """Get database connection"""
-    db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'openledger.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+from database import Database
 
 
-def calculate_summary_metrics(entity_id: Optional[int] = None) -> Dict:
+def _linear_trend(values) -> Tuple[float, float]:
+    """
+    Least-squares slope and intercept of values against their index.
+    
+    Args:
+        values: Sequence of observations, one per period
+        
+    Returns:
+        (slope, intercept); slope is 0 when there are fewer than 2 points
+    """
+    y = np.asarray(values, dtype=np.float64)
+    if y.size < 2:
+        return 0.0, float(y.mean()) if y.size else 0.0
+    
+    x = np.arange(y.size, dtype=np.float64)
+    x_centered = x - x.mean()
+    denominator = x_centered @ x_centered
+    slope = (x_centered @ (y - y.mean())) / denominator if denominator != 0 else 0.0
+    intercept = y.mean() - slope * x.mean()
+    return float(slope), float(intercept)
+
+
+async def calculate_summary_metrics(db: Database, entity_id: Optional[int] = None) -> Dict:
     """
     Calculate key financial summary metrics.
     
@@ -29,186 +45,157 @@ def calculate_summary_metrics(entity_id: Optional[int] = None) -> Dict:
     - Budget variance
     
     Args:
+        db: Database connection
         entity_id: Optional entity filter
         
     Returns:
         Dictionary with summary metrics
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Current month boundaries
-        now = datetime.now()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # MTD Revenue (income transactions)
-        cursor.execute("""
-            SELECT COALESCE(SUM(amount), 0) as total
-            FROM transactions
-            WHERE transaction_type = 'income'
-            AND date >= ?
-        """, (month_start.date(),))
-        mtd_revenue = cursor.fetchone()['total']
-        
-        # MTD Expenses
-        cursor.execute("""
-            SELECT COALESCE(SUM(amount), 0) as total
+    # All summary aggregates in one round-trip: the scalar CTEs repeat on
+    # every monthly row (at least one row thanks to the LEFT JOIN). Period
+    # boundaries are computed by SQLite in local time, like datetime.now()
+    rows = await db.fetch_rows("""
+        WITH mtd AS (
+            -- MTD revenue (income) and expenses
+            SELECT 
+                COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount END), 0) as revenue,
+                COALESCE(SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount END), 0) as expenses
             FROM transactions
-            WHERE transaction_type IN ('expense', 'disbursement')
-            AND date >= ?
-        """, (month_start.date(),))
-        mtd_expenses = cursor.fetchone()['total']
-        
-        # Last 30 days for burn rate
-        thirty_days_ago = (now - timedelta(days=30)).date()
-        
-        cursor.execute("""
+            WHERE date >= date('now', 'localtime', 'start of month')
+        ),
+        burn AS (
+            -- Last 30 days for burn rate
             SELECT COALESCE(AVG(daily_expense), 0) as burn_rate
             FROM (
                 SELECT date, SUM(amount) as daily_expense
                 FROM transactions
                 WHERE transaction_type IN ('expense', 'disbursement')
-                AND date >= ?
+                AND date >= date('now', 'localtime', '-30 days')
                 GROUP BY date
             )
-        """, (thirty_days_ago,))
-        burn_rate = cursor.fetchone()['burn_rate']
-        
-        # Cashflow trend (last 6 months, monthly aggregates)
-        six_months_ago = (now - timedelta(days=180)).date()
-        
-        cursor.execute("""
-            SELECT 
-                strftime('%Y-%m', date) as month,
-                SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END) as income,
-                SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount ELSE 0 END) as expenses
-            FROM transactions
-            WHERE date >= ?
-            GROUP BY strftime('%Y-%m', date)
-            ORDER BY month
-        """, (six_months_ago,))
-        
-        monthly_data = cursor.fetchall()
-        cashflow_data = [(row['income'] - row['expenses']) for row in monthly_data]
-        
-        # Simple linear trend slope
-        if len(cashflow_data) >= 2:
-            x_mean = sum(range(len(cashflow_data))) / len(cashflow_data)
-            y_mean = sum(cashflow_data) / len(cashflow_data)
-            
-            numerator = sum((i - x_mean) * (y - y_mean) for i, y in enumerate(cashflow_data))
-            denominator = sum((i - x_mean) ** 2 for i in range(len(cashflow_data)))
-            
-            trend_slope = numerator / denominator if denominator != 0 else 0
-        else:
-            trend_slope = 0
-        
-        # Budget variance
-        cursor.execute("""
+        ),
+        budget AS (
+            -- Budget variance
             SELECT 
                 COALESCE(SUM(allocated_amount), 0) as total_budget,
                 COALESCE(SUM(spent_amount), 0) as total_spent
             FROM budget_items
             JOIN budgets ON budget_items.budget_id = budgets.id
             WHERE budgets.status = 'active'
-        """)
-        budget_row = cursor.fetchone()
-        total_budget = budget_row['total_budget']
-        total_spent = budget_row['total_spent']
-        
-        budget_variance = ((total_spent - total_budget) / total_budget * 100) if total_budget > 0 else 0
-        
-        return {
-            "mtd_revenue": round(mtd_revenue, 2),
-            "mtd_expenses": round(mtd_expenses, 2),
-            "net_cashflow": round(mtd_revenue - mtd_expenses, 2),
-            "burn_rate": round(burn_rate, 2),
-            "cashflow_trend_slope": round(trend_slope, 2),
-            "budget_variance_percent": round(budget_variance, 2),
-            "total_budget": round(total_budget, 2),
-            "total_spent": round(total_spent, 2),
-            "period": "MTD",
-            "generated_at": datetime.utcnow().isoformat()
-        }
-        
-    finally:
-        conn.close()
+        ),
+        monthly AS (
+            -- Cashflow trend (last 6 months, monthly aggregates)
+            SELECT 
+                month,
+                SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END) as income,
+                SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount ELSE 0 END) as expenses
+            FROM transactions
+            WHERE date >= date('now', 'localtime', '-180 days')
+            GROUP BY month
+        )
+        SELECT 
+            mtd.revenue as mtd_revenue,
+            mtd.expenses as mtd_expenses,
+            burn.burn_rate,
+            budget.total_budget,
+            budget.total_spent,
+            monthly.month,
+            monthly.income - monthly.expenses as net_cashflow
+        FROM mtd
+        CROSS JOIN burn
+        CROSS JOIN budget
+        LEFT JOIN monthly ON 1 = 1
+        ORDER BY monthly.month
+    """)
+    
+    first = rows[0]
+    mtd_revenue = first['mtd_revenue']
+    mtd_expenses = first['mtd_expenses']
+    burn_rate = first['burn_rate']
+    total_budget = first['total_budget']
+    total_spent = first['total_spent']
+    
+    cashflow_data = [row['net_cashflow'] for row in rows if row['month'] is not None]
+    
+    # Simple linear trend slope
+    trend_slope, _ = _linear_trend(cashflow_data)
+    
+    budget_variance = ((total_spent - total_budget) / total_budget * 100) if total_budget > 0 else 0
+    
+    return {
+        "mtd_revenue": round(mtd_revenue, 2),
+        "mtd_expenses": round(mtd_expenses, 2),
+        "net_cashflow": round(mtd_revenue - mtd_expenses, 2),
+        "burn_rate": round(burn_rate, 2),
+        "cashflow_trend_slope": round(trend_slope, 2),
+        "budget_variance_percent": round(budget_variance, 2),
+        "total_budget": round(total_budget, 2),
+        "total_spent": round(total_spent, 2),
+        "period": "MTD",
+        "generated_at": datetime.utcnow().isoformat()
+    }
 
 
-def get_cashflow_predictions(horizon_months: int = 3) -> List[Dict]:
+async def get_cashflow_predictions(db: Database, horizon_months: int = 3) -> List[Dict]:
     """
     Generate simple cashflow predictions using linear regression.
     
     Args:
+        db: Database connection
         horizon_months: Number of months to predict
         
     Returns:
         List of predicted cashflow values with dates
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Get last 12 months of data
+    rows = await db.fetch_rows("""
+        SELECT 
+            month,
+            SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END) -
+            SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount ELSE 0 END) as net_cashflow
+        FROM transactions
+        WHERE date >= date('now', 'localtime', '-365 days')
+        GROUP BY month
+        ORDER BY month
+    """)
     
-    try:
-        # Get last 12 months of data
-        twelve_months_ago = (datetime.now() - timedelta(days=365)).date()
-        
-        cursor.execute("""
-            SELECT 
-                strftime('%Y-%m', date) as month,
-                SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END) -
-                SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount ELSE 0 END) as net_cashflow
-            FROM transactions
-            WHERE date >= ?
-            GROUP BY strftime('%Y-%m', date)
-            ORDER BY month
-        """, (twelve_months_ago,))
-        
-        historical_data = [(i, row['net_cashflow']) for i, row in enumerate(cursor.fetchall())]
-        
-        if len(historical_data) < 2:
-            # Not enough data, return simple average
-            return [{
-                "month": (datetime.now() + timedelta(days=30 * (i + 1))).strftime("%Y-%m"),
-                "predicted_cashflow": 0,
-                "confidence_lower": 0,
-                "confidence_upper": 0
-            } for i in range(horizon_months)]
-        
-        # Linear regression
-        x_values = [x for x, _ in historical_data]
-        y_values = [y for _, y in historical_data]
-        
-        x_mean = sum(x_values) / len(x_values)
-        y_mean = sum(y_values) / len(y_values)
-        
-        numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_values, y_values))
-        denominator = sum((x - x_mean) ** 2 for x in x_values)
-        
-        slope = numerator / denominator if denominator != 0 else 0
-        intercept = y_mean - slope * x_mean
-        
-        # Generate predictions
-        predictions = []
-        next_month_index = len(historical_data)
-        
-        for i in range(horizon_months):
-            month_index = next_month_index + i
-            predicted_value = slope * month_index + intercept
-            
-            # Simple confidence interval (±20%)
-            confidence_range = abs(predicted_value) * 0.2
-            
-            prediction_date = datetime.now() + timedelta(days=30 * (i + 1))
-            
-            predictions.append({
-                "month": prediction_date.strftime("%Y-%m"),
-                "predicted_cashflow": round(predicted_value, 2),
-                "confidence_lower": round(predicted_value - confidence_range, 2),
-                "confidence_upper": round(predicted_value + confidence_range, 2)
-            })
-        
-        return predictions
-        
-    finally:
-        conn.close()
+    historical_data = [row['net_cashflow'] for row in rows]
+    
+    if len(historical_data) < 2:
+        # Not enough data, return simple average
+        return [{
+            "month": (datetime.now() + timedelta(days=30 * (i + 1))).strftime("%Y-%m"),
+            "predicted_cashflow": 0,
+            "confidence_lower": 0,
+            "confidence_upper": 0
+        } for i in range(horizon_months)]
+    
+    # Linear regression
+    y = np.asarray(historical_data, dtype=np.float64)
+    x = np.arange(y.size, dtype=np.float64)
+    slope, intercept = _linear_trend(y)
+    
+    # Generate predictions for the next horizon_months indices in one pass
+    future_x = np.arange(y.size, y.size + horizon_months, dtype=np.float64)
+    predicted = slope * future_x + intercept
+    
+    if y.size > 2:
+        # 95% prediction interval from the residual standard error
+        residuals = y - (slope * x + intercept)
+        sigma = np.sqrt(residuals @ residuals / (y.size - 2))
+        x_centered = x - x.mean()
+        leverage = 1 + 1 / y.size + (future_x - x.mean()) ** 2 / (x_centered @ x_centered)
+        confidence_range = 1.96 * sigma * np.sqrt(leverage)
+    else:
+        # Two points fit exactly, so there is no residual spread: fall back to ±20%
+        confidence_range = np.abs(predicted) * 0.2
+    lower = predicted - confidence_range
+    upper = predicted + confidence_range
+    
+    now = datetime.now()
+    return [{
+        "month": (now + timedelta(days=30 * (i + 1))).strftime("%Y-%m"),
+        "predicted_cashflow": round(float(predicted[i]), 2),
+        "confidence_lower": round(float(lower[i]), 2),
+        "confidence_upper": round(float(upper[i]), 2)
+    } for i in range(horizon_months)]
@@ -18,37 +18,434 @@ Current APIs:
 13. CO2.js: Carbon footprint calculations (local)
 """
 
+import logging
+import sqlite3
 import httpx
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from time import monotonic, time
+from urllib.parse import quote, urlsplit
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
 import asyncio
-import json
-import hashlib
+import numpy as np
+import orjson
+from cachetools import LRUCache, TLRUCache
 
+from config import settings
 
-# Simple in-memory cache
-_cache = {}
-_cache_ttl = {}
+
+log = logging.getLogger(__name__)
+
+# Failures from the network or from decoding the upstream payload; anything
+# else is a bug and propagates
+_UPSTREAM_ERRORS = (httpx.HTTPError, ValueError)
+
+# Expired entries remain usable for this long (seconds) when the upstream is failing
+STALE_GRACE = 24 * 3600
+
+# Bounded in-memory cache of (fresh_until, value) pairs, deadlines in
+# monotonic() seconds; entries are evicted STALE_GRACE after they go stale
+_cache: TLRUCache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda key, entry, now: entry[0] + STALE_GRACE,
+    timer=monotonic
+)
+
+# Upstream ETag / Last-Modified of cached values, for conditional refreshes
+_validators: LRUCache = LRUCache(maxsize=10_000)
+
+# Set when the current request was answered from an expired entry
+_served_stale: ContextVar[bool] = ContextVar("served_stale", default=False)
 
 
 def _get_cache(key: str) -> Optional[any]:
     """Get value from cache if not expired"""
-    if key in _cache and key in _cache_ttl:
-        if datetime.now() < _cache_ttl[key]:
-            return _cache[key]
+    entry = _cache.get(key)
+    if entry is not None and monotonic() < entry[0]:
+        return entry[1]
     return None
 
 
+def _get_stale(key: str) -> Optional[any]:
+    """Get value from cache if expired less than STALE_GRACE ago"""
+    entry = _cache.get(key)
+    return entry[1] if entry is not None else None
+
+
+def served_stale() -> bool:
+    """Whether the current request was served a stale cached value"""
+    return _served_stale.get()
+
+
 def _set_cache(key: str, value: any, ttl_seconds: int = 3600):
     """Set cache with TTL"""
-    _cache[key] = value
-    _cache_ttl[key] = datetime.now() + timedelta(seconds=ttl_seconds)
+    _cache[key] = (monotonic() + ttl_seconds, value)
+    if ttl_seconds >= PERSIST_MIN_TTL:
+        _disk_misses.pop(key, None)
+        # Written in the background; _persist logs its own failures
+        asyncio.get_running_loop().run_in_executor(_disk_executor, _persist, key, value, ttl_seconds)
+
+
+# Entries cached at least this long (seconds) are also written to disk, so
+# a restart doesn't re-fetch them (and re-queue geocoding behind 1 req/sec)
+PERSIST_MIN_TTL = 86400
+_disk: Optional[sqlite3.Connection] = None
+
+# All disk cache I/O runs on this one thread, off the event loop and
+# serialized on the shared connection
+_disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="external-cache")
+
+# Keys looked up on disk and not found, so repeated misses (e.g. for empty
+# results, which are never cached) don't read the disk again
+_disk_misses: LRUCache = LRUCache(maxsize=10_000)
+
+
+def _disk_cache() -> sqlite3.Connection:
+    """Open the persistent cache, dropping entries past their stale grace (blocking)"""
+    global _disk
+    if _disk is None:
+        _disk = sqlite3.connect(settings.EXTERNAL_CACHE_PATH, check_same_thread=False)
+        _disk.execute("PRAGMA journal_mode = WAL")
+        _disk.execute("""
+            CREATE TABLE IF NOT EXISTS external_cache (
+                key TEXT PRIMARY KEY,
+                fresh_until REAL NOT NULL,
+                value BLOB NOT NULL
+            )
+        """)
+        _disk.execute("DELETE FROM external_cache WHERE fresh_until < ?", (time() - STALE_GRACE,))
+        _disk.commit()
+    return _disk
+
+
+def _persist(key: str, value: any, ttl_seconds: int):
+    """Write a cache entry to disk; expiry is stored as wall-clock time (blocking)"""
+    try:
+        disk = _disk_cache()
+        disk.execute(
+            "INSERT OR REPLACE INTO external_cache (key, fresh_until, value) VALUES (?, ?, ?)",
+            (key, time() + ttl_seconds, orjson.dumps(value))
+        )
+        disk.commit()
+    except (sqlite3.Error, TypeError):
+        log.warning("Persisting cache entry %s failed", key, exc_info=True)
+
+
+def _read_persisted(key: str) -> Optional[Tuple[float, bytes]]:
+    """Disk entry for key still within its stale grace, if any (blocking)"""
+    try:
+        return _disk_cache().execute(
+            "SELECT fresh_until, value FROM external_cache WHERE key = ? AND fresh_until >= ?",
+            (key, time() - STALE_GRACE)
+        ).fetchone()
+    except sqlite3.Error:
+        log.warning("Reading cache entry %s failed", key, exc_info=True)
+        return None
+
+
+async def _load_persisted(key: str):
+    """Copy a disk entry still within its stale grace into the memory cache"""
+    if key in _disk_misses:
+        return
+    
+    row = await asyncio.get_running_loop().run_in_executor(_disk_executor, _read_persisted, key)
+    if row is None:
+        _disk_misses[key] = True
+        return
+    
+    fresh_until, value = row
+    _cache[key] = (monotonic() + (fresh_until - time()), orjson.loads(value))
+
+
+class TokenBucket:
+    """
+    Limits the request rate to one upstream host.
+    
+    Holds up to burst tokens refilled at rps per second; acquire() waits
+    until a token is available. Waiters queue on the lock, so requests
+    are spaced out evenly instead of bursting when the bucket refills.
+    """
+    
+    def __init__(self, rps: float, burst: int = 1):
+        self._rps = rps
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            now = monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rps)
+            self._updated = now
+            
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rps)
+                self._tokens = 1.0
+                self._updated = monotonic()
+            
+            self._tokens -= 1
+
+
+class HostAdmission:
+    """
+    Caps concurrent requests to one upstream host.
+    
+    A counter guarded by an asyncio.Condition rather than a Semaphore, so
+    the limit can be changed at runtime with resize() (e.g. backing off
+    after upstream 429s) without recreating the controller. Hosts with a
+    published rate limit also get a TokenBucket, awaited once a slot is
+    held so the request itself goes out within the limit.
+    """
+    
+    def __init__(self, cmax: int, bucket: Optional[TokenBucket] = None):
+        self._cmax = cmax
+        self._active = 0
+        self._cond = asyncio.Condition()
+        self._bucket = bucket
+    
+    async def acquire(self):
+        async with self._cond:
+            while self._active >= self._cmax:
+                await self._cond.wait()
+            self._active += 1
+    
+    async def release(self):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify(1)
+    
+    async def resize(self, cmax: int):
+        async with self._cond:
+            self._cmax = max(1, cmax)
+            self._cond.notify_all()
+    
+    async def __aenter__(self):
+        await self.acquire()
+        if self._bucket is not None:
+            try:
+                await self._bucket.acquire()
+            except BaseException:
+                await self.release()
+                raise
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+
+# Shared client so connections (and TLS sessions) are reused across calls;
+# opened and closed by the application lifespan
+_client: Optional[httpx.AsyncClient] = None
+
+
+USER_AGENT = "OpenLedger-Hub/2.0"
+
+
+def _create_client() -> httpx.AsyncClient:
+    # httpx advertises Accept-Encoding for every decoder it has, including br
+    # when brotli is installed, and decompresses transparently
+    return httpx.AsyncClient(
+        http2=True,
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        timeout=httpx.Timeout(10.0, connect=3.0)
+    )
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the shared client, creating it on first use outside the app"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+async def open_http_client():
+    """Create the shared HTTP client (application startup)"""
+    _get_client()
+
+
+async def close_http_client():
+    """Close the shared HTTP client (application shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# Max concurrent requests per upstream host
+_HOST_LIMITS = {
+    "nominatim.openstreetmap.org": 1,
+    "api.coingecko.com": 5,
+    "api.worldbank.org": 10,
+}
+_DEFAULT_HOST_LIMIT = 20
+
+# Max requests per second for upstreams with a usage policy, in total
+# across all WORKER_PROCESSES
+_HOST_RATES = {
+    "nominatim.openstreetmap.org": 1,  # Nominatim usage policy
+    "api.coingecko.com": 10,
+    "api.openaq.org": 5,
+}
+_admissions: Dict[str, HostAdmission] = {}
+
+
+def _admission(url: str) -> HostAdmission:
+    """Get the admission controller for the host of url"""
+    host = urlsplit(url).netloc
+    admission = _admissions.get(host)
+    if admission is None:
+        rps = _HOST_RATES.get(host)
+        admission = _admissions[host] = HostAdmission(
+            _HOST_LIMITS.get(host, _DEFAULT_HOST_LIMIT),
+            # Rates are per host, not per process: split them across workers
+            TokenBucket(rps / settings.WORKER_PROCESSES) if rps else None
+        )
+    return admission
+
+
+# Upstream calls currently in flight, so concurrent misses share one request
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+async def _fetch_shared(key: str, ttl_seconds: int, fetcher: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+    """Fetch and cache key for all callers waiting on it, as (value, stale)"""
+    try:
+        value = await fetcher()
+    except Exception as e:
+        stale = _get_stale(key)
+        if not stale:
+            raise
+        
+        log.warning("Serving stale cache for %s: %s", key, e)
+        return stale, True
+    else:
+        if value:
+            _set_cache(key, value, ttl_seconds)
+        return value, False
+    finally:
+        del _inflight[key]
+
+
+def _retrieve_exception(task: asyncio.Task):
+    """Mark a shared fetch's error retrieved when no caller is left waiting"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def _cached(key: str, ttl_seconds: int, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Return the cached value for key, or fetch it once and cache it.
+    
+    Concurrent callers that miss on the same key await one shared task
+    instead of each issuing their own request; a caller that is cancelled
+    (e.g. its client disconnected) stops waiting without cancelling the
+    fetch for the others. Empty results and errors are not cached. If the
+    upstream fails and the key expired less than STALE_GRACE ago, the stale
+    value is returned and flagged for served_stale(); otherwise the error
+    propagates to every waiting caller.
+    
+    Args:
+        key: Cache key
+        ttl_seconds: How long a fetched value stays fresh
+        fetcher: Coroutine function performing the upstream call
+    """
+    if ttl_seconds >= PERSIST_MIN_TTL and key not in _cache:
+        await _load_persisted(key)
+    
+    cached = _get_cache(key)
+    if cached:
+        return cached
+    
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_shared(key, ttl_seconds, fetcher))
+        task.add_done_callback(_retrieve_exception)
+        _inflight[key] = task
+    
+    value, stale = await asyncio.shield(task)
+    if stale:
+        _served_stale.set(True)
+    return value
+
+
+async def multi_fetch(coros) -> Tuple[List[Any], List[Exception]]:
+    """
+    Run independent upstream calls concurrently.
+    
+    Args:
+        coros: Awaitables to run
+        
+    Returns:
+        (results, errors): results in input order with None where a call
+        failed, and the exceptions raised by the failed calls
+    """
+    outcomes = await asyncio.gather(*coros, return_exceptions=True)
+    results, errors = [], []
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            errors.append(outcome)
+            results.append(None)
+        else:
+            results.append(outcome)
+    return results, errors
+
+
+async def _conditional_get(
+    url: str,
+    cache_key: str,
+    ttl_seconds: int,
+    shape: Callable[[Any], Any],
+    **kwargs
+) -> Any:
+    """
+    Cached GET that revalidates expired entries with the upstream.
+    
+    The upstream ETag / Last-Modified are kept with the cached value; once
+    it expires the refresh sends If-None-Match / If-Modified-Since, and a
+    304 renews the old value without downloading or parsing the payload.
+    
+    Args:
+        url: Upstream URL
+        cache_key: Cache key
+        ttl_seconds: How long a fetched value stays fresh
+        shape: Turns the decoded JSON into the cached value
+        **kwargs: Extra arguments for client.get()
+    """
+    async def fetch():
+        previous = _get_stale(cache_key)
+        headers = {}
+        if previous is not None:
+            etag, last_modified = _validators.get(cache_key, (None, None))
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        
+        client = _get_client()
+        async with _admission(url):
+            response = await client.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and previous is not None:
+            return previous
+        response.raise_for_status()
+        
+        value = shape(orjson.loads(response.content))
+        _validators[cache_key] = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return value
+    
+    return await _cached(cache_key, ttl_seconds, fetch)
 
 
 # ============================================================================
 # EXISTING APIs (Enhanced)
 # ============================================================================
 
+DEFAULT_CURRENCIES = ("EUR", "GBP", "KES", "NGN", "TZS", "UGX")  # Sorted, upper-case
+
+
 async def get_exchange_rates(base: str = "USD", symbols: List[str] = None) -> Dict:
     """
     Get currency exchange rates from exchangerate.host.
@@ -64,32 +461,102 @@ async def get_exchange_rates(base: str = "USD", symbols: List[str] = None) -> Di
         rates = await get_exchange_rates("USD", ["KES", "EUR", "GBP"])
         # {"KES": 129.5, "EUR": 0.92, "GBP": 0.79}
     """
-    if symbols is None:
-        symbols = ["KES", "EUR", "GBP", "NGN", "TZS", "UGX"]
+    # Canonicalize so "eur, usd" and "USD,EUR" share one cache entry
+    base = base.strip().upper()
+    if symbols is not None:
+        symbols = sorted({symbol.strip().upper() for symbol in symbols if symbol.strip()})
+    if not symbols:
+        symbols = DEFAULT_CURRENCIES  # Already canonical
     
-    cache_key = f"exchange_rates:{base}:{','.join(sorted(symbols))}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
+    # The full table is cached once per base and every symbol subset is
+    # read from it, so overlapping requests don't each hit the network
+    url = f"https://api.exchangerate.host/latest?base={base}"
     
-    symbols_str = ",".join(symbols)
-    url = f"https://api.exchangerate.host/latest?base={base}&symbols={symbols_str}"
+    async def fetch_symbol(symbol: str) -> Optional[float]:
+        symbol_url = f"https://api.exchangerate.host/convert?from={base}&to={symbol}"
+        async with _admission(symbol_url):
+            response = await client.get(symbol_url)
+        response.raise_for_status()
+        return orjson.loads(response.content).get("result")
     
+    async def fetch_table():
+        async with _admission(url):
+            response = await client.get(url)
+        response.raise_for_status()
+        return orjson.loads(response.content).get("rates", {})
+    
+    async def fetch_symbols():
+        results, errors = await multi_fetch(fetch_symbol(symbol) for symbol in symbols)
+        if errors and len(errors) == len(symbols):
+            raise errors[0]
+        return {symbol: rate for symbol, rate in zip(symbols, results) if rate is not None}
+    
+    client = _get_client()
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            rates = data.get("rates", {})
-            _set_cache(cache_key, rates, ttl_seconds=3600)  # Cache for 1 hour
+        table = await _cached(f"exchange_rates:{base}", 3600, fetch_table)  # Cache for 1 hour
+        rates = {symbol: table[symbol] for symbol in symbols if symbol in table}
+        if rates:
             return rates
-            
-    except Exception as e:
-        print(f"Error fetching exchange rates: {e}")
+        
+        # Table came back without these symbols: query them individually, in parallel
+        return await _cached(f"exchange_rates:{base}:{','.join(symbols)}", 3600, fetch_symbols)
+    except _UPSTREAM_ERRORS:
+        log.warning("Exchange rates fetch failed", exc_info=True)
         return {}
 
 
+class CryptoBatcher:
+    """
+    Coalesces CoinGecko price lookups into multi-coin requests.
+    
+    /simple/price accepts a list of ids, so lookups arriving within one
+    short window for the same target currency are sent as a single
+    request and each caller gets its own coin's price back.
+    """
+    
+    def __init__(self, window_seconds: float = 0.02):
+        self._window = window_seconds
+        # vs_currency -> coin_id -> future for the batch being collected
+        self._pending: Dict[str, Dict[str, asyncio.Future]] = {}
+        self._flushes = set()
+    
+    async def price(self, coin_id: str, vs_currency: str) -> Optional[float]:
+        batch = self._pending.get(vs_currency)
+        if batch is None:
+            batch = self._pending[vs_currency] = {}
+            flush = asyncio.create_task(self._flush(vs_currency))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+        
+        future = batch.get(coin_id)
+        if future is None:
+            future = batch[coin_id] = asyncio.get_running_loop().create_future()
+        return await asyncio.shield(future)
+    
+    async def _flush(self, vs_currency: str):
+        await asyncio.sleep(self._window)
+        batch = self._pending.pop(vs_currency)
+        url = f"https://api.coingecko.com/api/v3/simple/price?ids={','.join(batch)}&vs_currencies={vs_currency}"
+        
+        try:
+            client = _get_client()
+            async with _admission(url):
+                response = await client.get(url)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+                future.exception()  # Mark retrieved for cancelled callers
+            return
+        
+        for coin_id, future in batch.items():
+            future.set_result(data.get(coin_id, {}).get(vs_currency))
+
+
+_crypto_batcher = CryptoBatcher()
+
+
 async def get_crypto_price(coin_id: str = "bitcoin", vs_currency: str = "usd") -> Optional[float]:
     """
     Get cryptocurrency price from CoinGecko.
@@ -106,25 +573,14 @@ async def get_crypto_price(coin_id: str = "bitcoin", vs_currency: str = "usd") -
         # 43250.75
     """
     cache_key = f"crypto:{coin_id}:{vs_currency}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
-    url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies={vs_currency}"
+    async def fetch():
+        return await _crypto_batcher.price(coin_id, vs_currency)
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            price = data.get(coin_id, {}).get(vs_currency)
-            if price:
-                _set_cache(cache_key, price, ttl_seconds=300)  # Cache for 5 minutes
-            return price
-            
-    except Exception as e:
-        print(f"Error fetching crypto price: {e}")
+        return await _cached(cache_key, 60, fetch)  # Cache for 1 minute
+    except _UPSTREAM_ERRORS:
+        log.warning("Crypto price fetch failed", exc_info=True)
         return None
 
 
@@ -144,25 +600,22 @@ async def get_weather(latitude: float, longitude: float) -> Optional[Dict]:
         # {"temperature": 22.5, "windspeed": 10.2, "weathercode": 0}
     """
     cache_key = f"weather:{latitude},{longitude}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
     url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true"
     
+    async def fetch():
+        client = _get_client()
+        async with _admission(url):
+            response = await client.get(url)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        return data.get("current_weather", {})
+    
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            weather = data.get("current_weather", {})
-            if weather:
-                _set_cache(cache_key, weather, ttl_seconds=1800)  # Cache for 30 minutes
-            return weather
-            
-    except Exception as e:
-        print(f"Error fetching weather: {e}")
+        return await _cached(cache_key, 1800, fetch)  # Cache for 30 minutes
+    except _UPSTREAM_ERRORS:
+        log.warning("Weather fetch failed", exc_info=True)
         return None
 
 
@@ -183,38 +636,31 @@ async def geocode_address(address: str) -> Optional[Dict]:
         # {"lat": -1.286389, "lon": 36.817223, "display_name": "..."}
     """
     cache_key = f"geocode:{address}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
-    url = f"https://nominatim.openstreetmap.org/search?q={address}&format=json&limit=1"
+    url = "https://nominatim.openstreetmap.org/search"
+    params = {"q": address, "format": "json", "limit": 1}
+    
+    async def fetch():
+        client = _get_client()
+        # Nominatim usage policy (1 req/sec) is enforced by its token bucket
+        async with _admission(url):
+            response = await client.get(url, params=params)  # Client User-Agent is required by Nominatim
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        if data and len(data) > 0:
+            return {
+                "lat": float(data[0].get("lat")),
+                "lon": float(data[0].get("lon")),
+                "display_name": data[0].get("display_name")
+            }
+        
+        return None
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Respect usage policy: 1 req/sec
-            await asyncio.sleep(1)
-            
-            response = await client.get(
-                url,
-                timeout=10.0,
-                headers={"User-Agent": "OpenLedger-Hub/2.0"}  # Required by Nominatim
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data and len(data) > 0:
-                location = {
-                    "lat": float(data[0].get("lat")),
-                    "lon": float(data[0].get("lon")),
-                    "display_name": data[0].get("display_name")
-                }
-                _set_cache(cache_key, location, ttl_seconds=86400)  # Cache for 24 hours
-                return location
-            
-            return None
-            
-    except Exception as e:
-        print(f"Error geocoding address: {e}")
+        return await _cached(cache_key, 86400, fetch)  # Cache for 24 hours
+    except _UPSTREAM_ERRORS:
+        log.warning("Geocoding failed", exc_info=True)
         return None
 
 
@@ -245,28 +691,23 @@ async def get_macro_indicator(
         gdp = await get_macro_indicator("KE", "NY.GDP.MKTP.CD", "2020", "2023")
     """
     cache_key = f"macro:{country}:{indicator}:{date_start}:{date_end}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
     date_param = f"date={date_start}:{date_end}" if date_start and date_end else ""
     url = f"https://api.worldbank.org/v2/country/{country}/indicator/{indicator}?{date_param}&format=json&per_page=100"
     
+    def shape(data):
+        if len(data) > 1:
+            return data[1]  # First element is metadata
+        
+        return None
+    
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=15.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            if len(data) > 1:
-                indicators = data[1]  # First element is metadata
-                _set_cache(cache_key, indicators, ttl_seconds=86400)  # Cache for 24 hours
-                return indicators
-            
-            return None
-            
-    except Exception as e:
-        print(f"Error fetching macro indicator: {e}")
+        return await _conditional_get(  # Cache for 24 hours
+            url, cache_key, 86400, shape,
+            timeout=httpx.Timeout(15.0, connect=3.0)
+        )
+    except _UPSTREAM_ERRORS:
+        log.warning("Macro indicator fetch failed", exc_info=True)
         return None
 
 
@@ -288,42 +729,40 @@ async def get_country_info(country_name: str) -> Optional[Dict]:
         info = await get_country_info("Kenya")
         # {"name": "Kenya", "population": 54985000, "capital": "Nairobi", ...}
     """
-    cache_key = f"country:{country_name.lower()}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
+    country_name = country_name.lower()
+    cache_key = f"country:{country_name}"
     
-    url = f"https://restcountries.com/v3.1/name/{country_name}"
+    url = f"https://restcountries.com/v3.1/name/{quote(country_name)}"
+    # Only request the fields we keep; full records include translations,
+    # borders, demonyms etc.
+    params = {
+        "fields": "name,capital,population,area,region,subregion,flags,currencies,languages,timezones,cca2"
+    }
+    
+    def shape(data):
+        if data and len(data) > 0:
+            country = data[0]
+            return {
+                "name": country.get("name", {}).get("common"),
+                "official_name": country.get("name", {}).get("official"),
+                "capital": country.get("capital", [""])[0] if country.get("capital") else "",
+                "population": country.get("population"),
+                "area": country.get("area"),
+                "region": country.get("region"),
+                "subregion": country.get("subregion"),
+                "flag": country.get("flags", {}).get("png"),
+                "currencies": country.get("currencies", {}),
+                "languages": country.get("languages", {}),
+                "timezones": country.get("timezones", []),
+                "code": country.get("cca2")
+            }
+        
+        return None
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data and len(data) > 0:
-                country = data[0]
-                result = {
-                    "name": country.get("name", {}).get("common"),
-                    "official_name": country.get("name", {}).get("official"),
-                    "capital": country.get("capital", [""])[0] if country.get("capital") else "",
-                    "population": country.get("population"),
-                    "area": country.get("area"),
-                    "region": country.get("region"),
-                    "subregion": country.get("subregion"),
-                    "flag": country.get("flags", {}).get("png"),
-                    "currencies": country.get("currencies", {}),
-                    "languages": country.get("languages", {}),
-                    "timezones": country.get("timezones", []),
-                    "code": country.get("cca2")
-                }
-                _set_cache(cache_key, result, ttl_seconds=604800)  # Cache for 7 days
-                return result
-            
-            return None
-            
-    except Exception as e:
-        print(f"Error fetching country info: {e}")
+        return await _conditional_get(url, cache_key, 604800, shape, params=params)  # Cache for 7 days
+    except _UPSTREAM_ERRORS:
+        log.warning("Country info fetch failed", exc_info=True)
         return None
 
 
@@ -343,23 +782,13 @@ async def get_public_holidays(country_code: str, year: int) -> Optional[List[Dic
         # [{"date": "2024-01-01", "name": "New Year's Day", ...}, ...]
     """
     cache_key = f"holidays:{country_code}:{year}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
     url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/{country_code}"
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            holidays = response.json()
-            
-            _set_cache(cache_key, holidays, ttl_seconds=86400)  # Cache for 24 hours
-            return holidays
-            
-    except Exception as e:
-        print(f"Error fetching public holidays: {e}")
+        return await _conditional_get(url, cache_key, 86400, lambda data: data)  # Cache for 24 hours
+    except _UPSTREAM_ERRORS:
+        log.warning("Public holidays fetch failed", exc_info=True)
         return None
 
 
@@ -378,37 +807,36 @@ async def get_book_info(isbn: str) -> Optional[Dict]:
         # {"title": "Fantastic Mr Fox", "authors": [...], ...}
     """
     cache_key = f"book:{isbn}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
-    url = f"https://openlibrary.org/api/books?bibkeys=ISBN:{isbn}&format=json&jscmd=data"
+    url = "https://openlibrary.org/api/books"
+    params = {"bibkeys": f"ISBN:{isbn}", "format": "json", "jscmd": "data"}
+    
+    async def fetch():
+        client = _get_client()
+        async with _admission(url):
+            response = await client.get(url, params=params)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        book_key = f"ISBN:{isbn}"
+        if book_key in data:
+            book = data[book_key]
+            return {
+                "title": book.get("title"),
+                "authors": [author.get("name") for author in book.get("authors", [])],
+                "cover": book.get("cover", {}).get("large"),
+                "publishers": [pub.get("name") for pub in book.get("publishers", [])],
+                "publish_date": book.get("publish_date"),
+               "subjects": [subj.get("name") for subj in book.get("subjects", [])],
+                "url": book.get("url")
+            }
+        
+        return None
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            book_key = f"ISBN:{isbn}"
-            if book_key in data:
-                book = data[book_key]
-                result = {
-                    "title": book.get("title"),
-                    "authors": [author.get("name") for author in book.get("authors", [])],
-                    "cover": book.get("cover", {}).get("large"),
-                    "publishers": [pub.get("name") for pub in book.get("publishers", [])],
-                    "publish_date": book.get("publish_date"),
-                   "subjects": [subj.get("name") for subj in book.get("subjects", [])],
-                    "url": book.get("url")
-                }
-                _set_cache(cache_key, result, ttl_seconds=604800)  # Cache for 7 days
-                return result
-            
-            return None
-            
-    except Exception as e:
-        print(f"Error fetching book info: {e}")
+        return await _cached(cache_key, 604800, fetch)  # Cache for 7 days
+    except _UPSTREAM_ERRORS:
+        log.warning("Book info fetch failed", exc_info=True)
         return None
 
 
@@ -424,33 +852,38 @@ async def search_books(query: str, limit: int = 10) -> Optional[List[Dict]]:
         List of books matching query
     """
     cache_key = f"book_search:{query}:{limit}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
-    url = f"https://openlibrary.org/search.json?q={query}&limit={limit}"
+    # Only request the fields we keep; full search docs are several KB each
+    url = "https://openlibrary.org/search.json"
+    params = {
+        "q": query,
+        "limit": limit,
+        "fields": "title,author_name,first_publish_year,isbn,key"
+    }
+    
+    async def fetch():
+        client = _get_client()
+        async with _admission(url):
+            response = await client.get(url, params=params)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        books = []
+        for doc in data.get("docs", []):
+            books.append({
+                "title": doc.get("title"),
+                "authors": doc.get("author_name", []),
+                "first_publish_year": doc.get("first_publish_year"),
+                "isbn": doc.get("isbn", [""])[0] if doc.get("isbn") else "",
+                "key": doc.get("key")
+            })
+        
+        return books
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            books = []
-            for doc in data.get("docs", []):
-                books.append({
-                    "title": doc.get("title"),
-                    "authors": doc.get("author_name", []),
-                    "first_publish_year": doc.get("first_publish_year"),
-                    "isbn": doc.get("isbn", [""])[0] if doc.get("isbn") else "",
-                    "key": doc.get("key")
-                })
-            
-            _set_cache(cache_key, books, ttl_seconds=3600)  # Cache for 1 hour
-            return books
-            
-    except Exception as e:
-        print(f"Error searching books: {e}")
+        return await _cached(cache_key, 3600, fetch)  # Cache for 1 hour
+    except _UPSTREAM_ERRORS:
+        log.warning("Book search failed", exc_info=True)
         return None
 
 
@@ -469,40 +902,44 @@ async def generate_random_users(count: int = 10, nationality: str = "us") -> Opt
         users = await generate_random_users(5, "ke")
     """
     cache_key = f"random_users:{count}:{nationality}:{datetime.now().strftime('%Y%m%d')}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
-    url = f"https://randomuser.me/api/?results={count}&nat={nationality}"
+    url = "https://randomuser.me/api/"
+    params = {
+        "results": count,
+        "nat": nationality,
+        "inc": "name,gender,email,phone,location,dob,picture"  # Only the fields we keep
+    }
+    
+    async def fetch():
+        client = _get_client()
+        async with _admission(url):
+            response = await client.get(url, params=params)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        users = []
+        for user in data.get("results", []):
+            users.append({
+                "name": f"{user['name']['first']} {user['name']['last']}",
+                "gender": user["gender"],
+                "email": user["email"],
+                "phone": user["phone"],
+                "location": {
+                    "city": user["location"]["city"],
+                    "state": user["location"]["state"],
+                    "country": user["location"]["country"]
+                },
+                "dob": user["dob"]["date"],
+                "age": user["dob"]["age"],
+                "picture": user["picture"]["large"]
+            })
+        
+        return users
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            users = []
-            for user in data.get("results", []):
-                users.append({
-                    "name": f"{user['name']['first']} {user['name']['last']}",
-                    "gender": user["gender"],
-                    "email": user["email"],
-                    "phone": user["phone"],
-                    "location": {
-                        "city": user["location"]["city"],
-                        "state": user["location"]["state"],
-                        "country": user["location"]["country"]
-                    },
-                    "dob": user["dob"]["date"],
-                    "age": user["dob"]["age"],
-                    "picture": user["picture"]["large"]
-                })
-            
-            _set_cache(cache_key, users, ttl_seconds=3600)  # Cache for 1 hour
-            return users
-            
-    except Exception as e:
-        print(f"Error generating random users: {e}")
+        return await _cached(cache_key, 3600, fetch)  # Cache for 1 hour
+    except _UPSTREAM_ERRORS:
+        log.warning("Random user generation failed", exc_info=True)
         return None
 
 
@@ -521,36 +958,38 @@ async def get_air_quality(country_code: str, limit: int = 10) -> Optional[List[D
         aq = await get_air_quality("KE", 5)
     """
     cache_key = f"air_quality:{country_code}:{limit}"
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
     
     url = f"https://api.openaq.org/v2/latest?limit={limit}&country={country_code}"
     
+    async def fetch():
+        client = _get_client()
+        async with _admission(url):
+            response = await client.get(url)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        results = []
+        for result in data.get("results", []):
+            results.append({
+                "location": result.get("location"),
+                "city": result.get("city"),
+                "country": result.get("country"),
+                "coordinates": result.get("coordinates"),
+                "measurements": result.get("measurements", [])
+            })
+        
+        return results
+    
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for result in data.get("results", []):
-                results.append({
-                    "location": result.get("location"),
-                    "city": result.get("city"),
-                    "country": result.get("country"),
-                    "coordinates": result.get("coordinates"),
-                    "measurements": result.get("measurements", [])
-                })
-            
-            _set_cache(cache_key, results, ttl_seconds=1800)  # Cache for 30 minutes
-            return results
-            
-    except Exception as e:
-        print(f"Error fetching air quality: {e}")
+        return await _cached(cache_key, 1800, fetch)  # Cache for 30 minutes
+    except _UPSTREAM_ERRORS:
+        log.warning("Air quality fetch failed", exc_info=True)
         return None
 
 
+IP_GEOLOCATION_URL = "https://ipapi.co/json/"
+
+
 async def get_ip_geolocation() -> Optional[Dict]:
     """
     Get geolocation based on IP using ipapi.co (free, no key required).
@@ -562,39 +1001,103 @@ async def get_ip_geolocation() -> Optional[Dict]:
         location = await get_ip_geolocation()
         # {"city": "Nairobi", "country": "Kenya", "latitude": -1.286389, ...}
     """
-    cache_key = f"ip_geo:{datetime.now().strftime('%Y%m%d%H')}"  # Cache per hour
-    cached = _get_cache(cache_key)
-    if cached:
-        return cached
+    cache_key = "ip_geo"
+    url = IP_GEOLOCATION_URL
     
-    url = "https://ipapi.co/json/"
+    async def fetch():
+        client = _get_client()
+        async with _admission(url):
+            response = await client.get(url)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        return {
+            "ip": data.get("ip"),
+            "city": data.get("city"),
+            "region": data.get("region"),
+            "country": data.get("country_name"),
+            "country_code": data.get("country_code"),
+            "latitude": data.get("latitude"),
+            "longitude": data.get("longitude"),
+            "timezone": data.get("timezone"),
+            "currency": data.get("currency")
+        }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            result = {
-                "ip": data.get("ip"),
-                "city": data.get("city"),
-                "region": data.get("region"),
-                "country": data.get("country_name"),
-                "country_code": data.get("country_code"),
-                "latitude": data.get("latitude"),
-                "longitude": data.get("longitude"),
-                "timezone": data.get("timezone"),
-                "currency": data.get("currency")
-            }
-            
-            _set_cache(cache_key, result, ttl_seconds=3600)  # Cache for 1 hour
-            return result
-            
-    except Exception as e:
-        print(f"Error fetching IP geolocation: {e}")
+        return await _cached(cache_key, 3600, fetch)  # Cache for 1 hour
+    except _UPSTREAM_ERRORS:
+        log.warning("IP geolocation fetch failed", exc_info=True)
         return None
 
 
+async def gather_enrichments(
+    exchange: Optional[Dict] = None,
+    crypto: Optional[Dict] = None,
+    weather: Optional[Dict] = None,
+    country: Optional[Dict] = None,
+    holidays: Optional[Dict] = None,
+    air_quality: Optional[Dict] = None,
+    ip_geo: bool = False
+) -> Dict:
+    """
+    Fetch several enrichments concurrently.
+    
+    Each argument is the keyword arguments for the matching fetcher; only
+    the enrichments that are given are fetched, all at once, so a dashboard
+    pays for the slowest upstream rather than the sum of them.
+    
+    Args:
+        exchange: Arguments for get_exchange_rates
+        crypto: Arguments for get_crypto_price
+        weather: Arguments for get_weather
+        country: Arguments for get_country_info
+        holidays: Arguments for get_public_holidays
+        air_quality: Arguments for get_air_quality
+        ip_geo: Whether to include get_ip_geolocation
+    
+    Returns:
+        Dictionary keyed by enrichment name; None where a fetch failed
+    
+    Example:
+        data = await gather_enrichments(
+            exchange={"base": "USD"},
+            weather={"latitude": -1.286389, "longitude": 36.817223},
+            holidays={"country_code": "KE", "year": 2024}
+        )
+    """
+    specs = {
+        "exchange": (get_exchange_rates, exchange),
+        "crypto": (get_crypto_price, crypto),
+        "weather": (get_weather, weather),
+        "country": (get_country_info, country),
+        "holidays": (get_public_holidays, holidays),
+        "air_quality": (get_air_quality, air_quality),
+        "ip_geo": (get_ip_geolocation, {} if ip_geo else None),
+    }
+    
+    keys = []
+    coros = []
+    for key, (fetcher, kwargs) in specs.items():
+        if kwargs is not None:
+            keys.append(key)
+            coros.append(fetcher(**kwargs))
+    
+    results, _ = await multi_fetch(coros)
+    return dict(zip(keys, results))
+
+
+# Emission factors (kg CO2e per unit)
+ELECTRICITY_FACTOR = 0.475  # per kWh (global average)
+GAS_FACTOR = 5.3  # per therm
+FUEL_FACTOR = 2.31  # per liter
+FLIGHT_FACTOR = 0.255  # per km (economy)
+_CARBON_FACTORS = np.array([ELECTRICITY_FACTOR, GAS_FACTOR, FUEL_FACTOR, FLIGHT_FACTOR])
+
+# Offset equivalents
+TREE_KG_CO2_PER_YEAR = 21.77  # Average tree absorbs 21.77 kg CO2/year
+CAR_KG_CO2_PER_DAY = 11.2  # Average car emits 11.2 kg CO2/day
+
+
 def calculate_carbon_footprint(
     electricity_kwh: float = 0,
     natural_gas_therms: float = 0,
@@ -623,12 +1126,6 @@ def calculate_carbon_footprint(
         )
         # {"total_kg_co2e": 1850.5, "breakdown": {...}}
     """
-    # Emission factors (kg CO2e per unit)
-    ELECTRICITY_FACTOR = 0.475  # per kWh (global average)
-    GAS_FACTOR = 5.3  # per therm
-    FUEL_FACTOR = 2.31  # per liter
-    FLIGHT_FACTOR = 0.255  # per km (economy)
-    
     electricity_co2 = electricity_kwh * ELECTRICITY_FACTOR
     gas_co2 = natural_gas_therms * GAS_FACTOR
     fuel_co2 = fuel_liters * FUEL_FACTOR
@@ -646,7 +1143,46 @@ def calculate_carbon_footprint(
             "flights_kg_co2e": round(flight_co2, 2)
         },
         "equivalents": {
-            "trees_needed_to_offset": round(total / 21.77, 1),  # Average tree absorbs 21.77 kg CO2/year
-            "cars_off_road_days": round(total / 11.2, 1)  # Average car emits 11.2 kg CO2/day
+            "trees_needed_to_offset": round(total / TREE_KG_CO2_PER_YEAR, 1),
+            "cars_off_road_days": round(total / CAR_KG_CO2_PER_DAY, 1)
         }
     }
+
+
+def calculate_carbon_footprint_batch(
+    electricity_kwh,
+    natural_gas_therms,
+    fuel_liters,
+    flights_km
+) -> Dict:
+    """
+    Calculate carbon footprints for many records at once.
+    
+    Vectorized counterpart of calculate_carbon_footprint for scoring
+    transaction sets (e.g. ESG reports), using the same emission factors.
+    
+    Args:
+        electricity_kwh: Electricity consumption in kWh, one value per record
+        natural_gas_therms: Natural gas in therms, one value per record
+        fuel_liters: Fuel (petrol/diesel) in liters, one value per record
+        flights_km: Air travel in kilometers, one value per record
+        
+    Returns:
+        NumPy arrays in kg CO2e: total per record, the per-record breakdown
+        (columns: electricity, natural gas, fuel, flights) and trees needed
+        to offset each total
+    """
+    usage = np.column_stack([
+        np.asarray(electricity_kwh, dtype=np.float64),
+        np.asarray(natural_gas_therms, dtype=np.float64),
+        np.asarray(fuel_liters, dtype=np.float64),
+        np.asarray(flights_km, dtype=np.float64)
+    ])
+    breakdown = usage * _CARBON_FACTORS
+    total = breakdown.sum(axis=1)
+    
+    return {
+        "total_kg_co2e": np.round(total, 2),
+        "breakdown": np.round(breakdown, 2),
+        "trees_needed_to_offset": np.round(total / TREE_KG_CO2_PER_YEAR, 1)
+    }
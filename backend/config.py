@@ -3,6 +3,7 @@ OpenLedger Hub - Configuration Management
 Simple configuration for open-access platform
 """
 
+from functools import cached_property
 from pydantic_settings import BaseSettings
 from typing import List
 import os
@@ -20,6 +21,9 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./openledger.db"
     
+    # External API cache (long-lived entries survive restarts)
+    EXTERNAL_CACHE_PATH: str = "./external_cache.db"
+    
     # CORS
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://localhost:3001,http://localhost:3002"
     
@@ -27,6 +31,9 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "./uploads"
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
     
+    # Server processes sharing upstream rate limits (set by gunicorn.conf.py)
+    WORKER_PROCESSES: int = 1
+    
     # Pagination
     DEFAULT_PAGE_SIZE: int = 50
     MAX_PAGE_SIZE: int = 200
@@ -34,12 +41,12 @@ class Settings(BaseSettings):
     # Frontend URL for CORS
     FRONTEND_URL: str = "http://localhost:3000"
     
-    @property
+    @cached_property
     def cors_origins(self) -> List[str]:
         """Parse CORS origins from comma-separated string"""
         return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
     
-    @property
+    @cached_property
     def database_path(self) -> str:
         """Extract database file path from URL"""
         return self.DATABASE_URL.replace("sqlite:///", "")
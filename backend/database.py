@@ -3,9 +3,10 @@ OpenLedger Black - Database Connection Manager
 SQLite with async support - lightning-fast, zero-cost, surgical precision
 """
 
+import asyncio
 import aiosqlite
 import sqlite3
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from contextlib import asynccontextmanager
 from config import settings
 import os
@@ -15,51 +16,145 @@ class Database:
     """
     SQLite database manager with async support
     Built for speed, reliability, and zero external dependencies
+    
+    Writes (execute/commit) go through a single connection, as SQLite
+    allows one writer at a time; fetch_one/fetch_all run on a pool of
+    read-only connections so reads proceed in parallel under WAL.
+    transaction() holds a lock on the writer so concurrent requests don't
+    commit or roll back each other's statements.
     """
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, readers: int = None):
         self.db_path = db_path or settings.database_path
+        self.readers = readers or min(8, (os.cpu_count() or 1) * 2)
         self._connection: Optional[aiosqlite.Connection] = None
+        self._reader_pool: Optional[asyncio.Queue] = None
+        self._write_lock = asyncio.Lock()
     
-    async def connect(self):
-        """Establish database connection"""
-        self._connection = await aiosqlite.connect(self.db_path)
-        self._connection.row_factory = aiosqlite.Row
+    async def _open(self) -> aiosqlite.Connection:
+        # sqlite3 keeps prepared statements in a per-connection LRU keyed by
+        # the SQL text; size it above the number of distinct route queries
+        connection = await aiosqlite.connect(self.db_path, cached_statements=256)
+        connection.row_factory = aiosqlite.Row
         # Enable foreign keys
-        await self._connection.execute("PRAGMA foreign_keys = ON")
-        await self._connection.commit()
+        await connection.execute("PRAGMA foreign_keys = ON")
+        # WAL lets readers proceed while a write is in progress
+        await connection.execute("PRAGMA journal_mode = WAL")
+        await connection.execute("PRAGMA synchronous = NORMAL")
+        await connection.execute("PRAGMA temp_store = MEMORY")
+        await connection.execute("PRAGMA cache_size = -16384")  # 16 MB page cache per connection
+        await connection.execute("PRAGMA mmap_size = 268435456")
+        return connection
+    
+    async def connect(self):
+        """Establish the writer connection and the reader pool"""
+        self._connection = await self._open()
+        
+        pool = asyncio.Queue()
+        for _ in range(self.readers):
+            reader = await self._open()
+            await reader.execute("PRAGMA query_only = ON")
+            pool.put_nowait(reader)
+        self._reader_pool = pool
     
     async def disconnect(self):
-        """Close database connection"""
+        """Close database connections"""
+        if self._reader_pool:
+            while not self._reader_pool.empty():
+                await self._reader_pool.get_nowait().close()
+            self._reader_pool = None
         if self._connection:
             await self._connection.close()
             self._connection = None
     
+    @asynccontextmanager
+    async def _reader(self):
+        """Borrow a read-only connection from the pool"""
+        if not self._connection:
+            await self.connect()
+        pool = self._reader_pool
+        connection = await pool.get()
+        try:
+            yield connection
+        finally:
+            pool.put_nowait(connection)
+    
     async def execute(self, query: str, params: tuple = None) -> aiosqlite.Cursor:
-        """Execute a single query"""
+        """
+        Execute a single query on the writer connection.
+        
+        Writes must run inside transaction(): a bare execute() + commit()
+        does not take the write lock, so its commit would also commit (or
+        its statement join) another request's open transaction.
+        """
         if not self._connection:
             await self.connect()
         return await self._connection.execute(query, params or ())
     
+    async def execute_returning(self, query: str, params: tuple = None) -> Optional[Dict[str, Any]]:
+        """
+        Execute a write with a RETURNING clause and fetch its row as dictionary.
+        
+        Runs on the writer connection, so the row is read back in the same
+        statement instead of a second SELECT; commit() afterwards as usual.
+        """
+        cursor = await self.execute(query, params)
+        row = await cursor.fetchone()
+        await cursor.close()
+        return dict(row) if row else None
+    
     async def execute_many(self, query: str, params_list: List[tuple]):
-        """Execute multiple queries with different parameters"""
+        """
+        Execute multiple queries with different parameters.
+        
+        Does not commit: call commit() or wrap in transaction(), so a batch
+        and the statements around it share a single commit.
+        """
         if not self._connection:
             await self.connect()
         await self._connection.executemany(query, params_list)
-        await self._connection.commit()
     
     async def fetch_one(self, query: str, params: tuple = None) -> Optional[Dict[str, Any]]:
         """Fetch a single row as dictionary"""
-        cursor = await self.execute(query, params)
-        row = await cursor.fetchone()
+        async with self._reader() as connection:
+            cursor = await connection.execute(query, params or ())
+            row = await cursor.fetchone()
         return dict(row) if row else None
     
     async def fetch_all(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
         """Fetch all rows as list of dictionaries"""
-        cursor = await self.execute(query, params)
-        rows = await cursor.fetchall()
+        async with self._reader() as connection:
+            cursor = await connection.execute(query, params or ())
+            rows = await cursor.fetchall()
         return [dict(row) for row in rows]
     
+    async def fetch_rows(self, query: str, params: tuple = None) -> List[aiosqlite.Row]:
+        """
+        Fetch all rows as sqlite3.Row objects, without copying them to dicts.
+        
+        Rows support row["column"] access but are read-only and not JSON
+        serializable, so use this for results consumed in Python (e.g.
+        aggregations), not for rows returned from a route.
+        """
+        async with self._reader() as connection:
+            cursor = await connection.execute(query, params or ())
+            return await cursor.fetchall()
+    
+    async def iterate(self, query: str, params: tuple = None) -> AsyncIterator[aiosqlite.Row]:
+        """
+        Yield rows one at a time as sqlite3.Row objects.
+        
+        The reader connection stays borrowed until the iteration finishes
+        (or the generator is closed), so results of any size are streamed
+        without materializing them, e.g. for exports.
+        """
+        async with self._reader() as connection:
+            async with connection.execute(query, params or ()) as cursor:
+                # aiosqlite fetches arraysize rows per worker-thread round trip
+                cursor.arraysize = 256
+                async for row in cursor:
+                    yield row
+    
     async def commit(self):
         """Commit current transaction"""
         if self._connection:
@@ -106,13 +201,34 @@ class Database:
     
     @asynccontextmanager
     async def transaction(self):
-        """Context manager for transactions"""
-        try:
-            yield self
-            await self.commit()
-        except Exception:
-            await self.rollback()
-            raise
+        """
+        Context manager for transactions
+        
+        Starts with BEGIN IMMEDIATE so the write lock is taken up front
+        rather than on the first write, which avoids SQLITE_BUSY on the
+        read-to-write upgrade. Not reentrant: the body must not open another
+        transaction().
+        
+        Rolls back on any exit without commit, including cancellation
+        (client disconnect, timeout), so a body's partial writes are never
+        committed by whichever request runs next.
+        """
+        async with self._write_lock:
+            if not self._connection:
+                await self.connect()
+            if self._connection.in_transaction:
+                # Left open by a write outside transaction(); never commit it
+                # along with this body's statements
+                print("[Database] Rolling back a transaction left open on the writer")
+                await self._connection.rollback()
+            await self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+                await self.commit()
+            except BaseException:
+                # Shielded so a second cancellation can't skip the rollback
+                await asyncio.shield(self.rollback())
+                raise
 
 
 # Global database instance
@@ -126,29 +242,82 @@ async def get_db() -> Database:
     return db
 
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "database", "migrations")
+
+
+def apply_migrations(conn: sqlite3.Connection):
+    """
+    Apply pending SQL migrations from database/migrations in filename order.
+    
+    Each file runs in its own transaction and is recorded in schema_version
+    under its filename stem, with its first comment line as description.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version TEXT PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            description TEXT
+        )
+    """)
+    applied = {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+    
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return
+    
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        version, ext = os.path.splitext(filename)
+        if ext != ".sql" or version in applied:
+            continue
+        
+        with open(os.path.join(MIGRATIONS_DIR, filename), 'r', encoding='utf-8') as f:
+            migration_sql = f.read()
+        
+        first_line = migration_sql.lstrip().split("\n", 1)[0]
+        description = first_line[2:].strip() if first_line.startswith("--") else ""
+        
+        conn.executescript(
+            "BEGIN;\n"
+            f"{migration_sql}\n;\n"
+            "INSERT INTO schema_version (version, description) VALUES "
+            f"('{version}', '{description.replace(chr(39), chr(39) * 2)}');\n"
+            "COMMIT;"
+        )
+        print(f"[Database] Applied migration {version}")
+
+
 def init_db():
     """
     Synchronous database initialization for startup
-    Creates schema and loads seed data if database doesn't exist
+    Creates schema and loads seed data if the database has no schema yet,
+    then applies any pending migrations
     """
-    db_exists = os.path.exists(settings.database_path)
-    
-    if not db_exists:
-        print("🔧 Initializing database...")
-        conn = sqlite3.connect(settings.database_path)
+    conn = sqlite3.connect(settings.database_path)
+    try:
+        # Set WAL before loading so seeding doesn't leave a rollback journal behind
+        conn.execute("PRAGMA journal_mode = WAL")
         
-        # Load schema
-        schema_path = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
-        with open(schema_path, 'r', encoding='utf-8') as f:
-            conn.executescript(f.read())
+        # schema.sql records itself in schema_version, so its presence means
+        # the database is already initialized (an empty file is not)
+        initialized = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        ).fetchone()
         
-        # Load seed data
-        seed_path = os.path.join(os.path.dirname(__file__), "database", "seed.sql")
-        with open(seed_path, 'r', encoding='utf-8') as f:
-            conn.executescript(f.read())
+        if not initialized:
+            print("🔧 Initializing database...")
+            
+            schema_path = os.path.join(os.path.dirname(__file__), "database", "schema.sql")
+            seed_path = os.path.join(os.path.dirname(__file__), "database", "seed.sql")
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                schema_sql = f.read()
+            with open(seed_path, 'r', encoding='utf-8') as f:
+                seed_sql = f.read()
+            
+            # Schema and seed load in one transaction: a failure leaves no partial schema
+            conn.executescript(f"BEGIN IMMEDIATE;\n{schema_sql}\n;\n{seed_sql}\n;\nCOMMIT;")
+            print("[Database] Initialized successfully")
+        else:
+            print("[Database] Already exists")
         
-        conn.commit()
+        apply_migrations(conn)
+    finally:
         conn.close()
-        print("[Database] Initialized successfully")
-    else:
-        print("[Database] Already exists")
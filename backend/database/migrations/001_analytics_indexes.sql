@@ -0,0 +1,8 @@
+-- Covering index and month column for analytics aggregates
+
+-- Month bucket used by the monthly cashflow GROUP BYs. ALTER TABLE can only
+-- add VIRTUAL generated columns; the index below stores the values.
+ALTER TABLE transactions ADD COLUMN month TEXT GENERATED ALWAYS AS (strftime('%Y-%m', date)) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_tx_month ON transactions(month);
+CREATE INDEX IF NOT EXISTS idx_tx_type_date_amount ON transactions(transaction_type, date, amount);
@@ -0,0 +1,14 @@
+-- Composite indexes for the asset and inventory listings
+
+-- list_assets filters on status and category_id and pages by created_at DESC;
+-- with all three in one index the page is read in order without a sort
+CREATE INDEX IF NOT EXISTS idx_assets_status_category_created ON assets(status, category_id, created_at DESC);
+
+-- The low-stock listing compares the two quantities and orders by
+-- current_quantity, so scanning this index avoids both the table and the sort
+CREATE INDEX IF NOT EXISTS idx_inventory_quantities ON inventory_items(current_quantity, minimum_quantity);
+
+-- asset_tag and item_code are declared UNIQUE, so SQLite already maintains an
+-- index for each; these duplicates only slowed down inserts
+DROP INDEX IF EXISTS idx_assets_tag;
+DROP INDEX IF EXISTS idx_inventory_code;
@@ -0,0 +1,42 @@
+-- Derive inventory total_value and is_low_stock in generated columns
+
+-- total_value was a plain column filled in once at insert, so it went stale as
+-- quantities changed. SQLite cannot turn an existing column into a generated
+-- one, so rebuild the table (foreign keys are off during migrations, and the
+-- inventory_movements reference resolves again once the new table is renamed).
+CREATE TABLE inventory_items_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_code TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    description TEXT,
+    category TEXT,
+    unit_of_measure TEXT NOT NULL,
+    current_quantity REAL NOT NULL DEFAULT 0,
+    minimum_quantity REAL DEFAULT 0,
+    maximum_quantity REAL,
+    unit_cost REAL,
+    total_value REAL GENERATED ALWAYS AS (COALESCE(unit_cost, 0) * current_quantity) VIRTUAL,
+    location TEXT,
+    supplier TEXT,
+    last_restocked_date DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_low_stock INTEGER GENERATED ALWAYS AS (current_quantity <= minimum_quantity) VIRTUAL
+);
+
+INSERT INTO inventory_items_new (
+    id, item_code, name, description, category, unit_of_measure, current_quantity,
+    minimum_quantity, maximum_quantity, unit_cost, location, supplier,
+    last_restocked_date, created_at, updated_at
+)
+SELECT
+    id, item_code, name, description, category, unit_of_measure, current_quantity,
+    minimum_quantity, maximum_quantity, unit_cost, location, supplier,
+    last_restocked_date, created_at, updated_at
+FROM inventory_items;
+
+DROP TABLE inventory_items;
+ALTER TABLE inventory_items_new RENAME TO inventory_items;
+
+CREATE INDEX IF NOT EXISTS idx_inventory_category ON inventory_items(category);
+CREATE INDEX IF NOT EXISTS idx_inventory_quantities ON inventory_items(current_quantity, minimum_quantity);
@@ -0,0 +1,7 @@
+-- Index for per-KPI latest-value and total lookups
+
+-- list_kpis ranks each KPI's values by recorded_date; reading them in
+-- (kpi_id, recorded_date DESC) order lets the window functions skip the sort.
+-- It also serves every kpi_id lookup, so the single-column index is dropped.
+CREATE INDEX IF NOT EXISTS idx_kpi_values_kpi_date ON kpi_values(kpi_id, recorded_date DESC);
+DROP INDEX IF EXISTS idx_kpi_values_kpi;
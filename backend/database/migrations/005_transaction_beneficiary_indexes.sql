@@ -0,0 +1,16 @@
+-- Covering and ordering indexes for transaction and beneficiary reads
+
+-- Date-range analytics (finance analytics, dashboard totals) read only these
+-- columns, so the range is answered from the index without touching rows
+CREATE INDEX IF NOT EXISTS idx_tx_date_type_amount_category ON transactions(date, transaction_type, amount, category_id);
+
+-- list_transactions pages by date DESC, created_at DESC; walking this index
+-- backwards yields that order, so LIMIT stops early instead of sorting all rows
+CREATE INDEX IF NOT EXISTS idx_tx_date_created ON transactions(date, created_at);
+
+-- list_beneficiaries filters on project_id and status together
+CREATE INDEX IF NOT EXISTS idx_beneficiaries_project_status ON beneficiaries(project_id, status);
+
+-- Prefixes of the indexes above
+DROP INDEX IF EXISTS idx_transactions_date;
+DROP INDEX IF EXISTS idx_beneficiaries_project;
@@ -0,0 +1,15 @@
+-- Per-month counters for generated transaction reference numbers
+
+-- create_transaction takes the next TXN-YYYYMM-NNNN number from here with an
+-- upsert instead of counting every transaction on each insert
+CREATE TABLE IF NOT EXISTS ref_counters (
+    year_month TEXT PRIMARY KEY,
+    next_val INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- Continue after numbers already issued by the old COUNT(*)-based scheme
+INSERT OR IGNORE INTO ref_counters (year_month, next_val)
+SELECT substr(reference_number, 5, 6), MAX(CAST(substr(reference_number, 12) AS INTEGER))
+FROM transactions
+WHERE reference_number GLOB 'TXN-[0-9][0-9][0-9][0-9][0-9][0-9]-[0-9]*'
+GROUP BY substr(reference_number, 5, 6);
@@ -0,0 +1,7 @@
+-- Partial covering index over active projects
+
+-- Dashboard totals sum budget and spend over active projects only; the
+-- partial index holds just those rows and both columns, so the aggregate is
+-- answered from the index without visiting completed or planned projects.
+-- status leads the key so the planner prefers it over idx_projects_status
+CREATE INDEX IF NOT EXISTS idx_projects_active ON projects(status, total_budget, spent_amount) WHERE status = 'active';
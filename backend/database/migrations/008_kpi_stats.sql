@@ -0,0 +1,64 @@
+-- Trigger-maintained running totals and latest value per KPI
+
+-- list_kpis reads each KPI's current value and all-time total from here
+-- instead of running window functions over every recorded value
+CREATE TABLE IF NOT EXISTS kpi_stats (
+    kpi_id INTEGER PRIMARY KEY,
+    total REAL NOT NULL DEFAULT 0,
+    last_value REAL,
+    last_date DATE,
+    FOREIGN KEY (kpi_id) REFERENCES kpis(id) ON DELETE CASCADE
+);
+
+-- Ties on recorded_date go to the most recently inserted value
+INSERT OR REPLACE INTO kpi_stats (kpi_id, total, last_value, last_date)
+SELECT
+    kpi_id,
+    SUM(value),
+    (SELECT value FROM kpi_values latest WHERE latest.kpi_id = kpi_values.kpi_id ORDER BY recorded_date DESC, id DESC LIMIT 1),
+    MAX(recorded_date)
+FROM kpi_values
+GROUP BY kpi_id;
+
+-- Recording a value is an increment
+CREATE TRIGGER IF NOT EXISTS trg_kpi_values_ai AFTER INSERT ON kpi_values
+BEGIN
+    INSERT INTO kpi_stats (kpi_id, total, last_value, last_date)
+    VALUES (NEW.kpi_id, NEW.value, NEW.value, NEW.recorded_date)
+    ON CONFLICT(kpi_id) DO UPDATE SET
+        total = total + excluded.total,
+        last_value = CASE
+            WHEN last_date IS NULL OR excluded.last_date >= last_date THEN excluded.last_value
+            ELSE last_value
+        END,
+        last_date = MAX(COALESCE(last_date, excluded.last_date), excluded.last_date);
+END;
+
+-- Edits and deletes are rare, so the KPI's row is recomputed from its values
+CREATE TRIGGER IF NOT EXISTS trg_kpi_values_au AFTER UPDATE OF kpi_id, value, recorded_date ON kpi_values
+BEGIN
+    DELETE FROM kpi_stats WHERE kpi_id IN (OLD.kpi_id, NEW.kpi_id);
+    INSERT INTO kpi_stats (kpi_id, total, last_value, last_date)
+    SELECT
+        kpi_id,
+        SUM(value),
+        (SELECT value FROM kpi_values latest WHERE latest.kpi_id = kpi_values.kpi_id ORDER BY recorded_date DESC, id DESC LIMIT 1),
+        MAX(recorded_date)
+    FROM kpi_values
+    WHERE kpi_id IN (OLD.kpi_id, NEW.kpi_id)
+    GROUP BY kpi_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_kpi_values_ad AFTER DELETE ON kpi_values
+BEGIN
+    DELETE FROM kpi_stats WHERE kpi_id = OLD.kpi_id;
+    INSERT INTO kpi_stats (kpi_id, total, last_value, last_date)
+    SELECT
+        kpi_id,
+        SUM(value),
+        (SELECT value FROM kpi_values latest WHERE latest.kpi_id = kpi_values.kpi_id ORDER BY recorded_date DESC, id DESC LIMIT 1),
+        MAX(recorded_date)
+    FROM kpi_values
+    WHERE kpi_id = OLD.kpi_id
+    GROUP BY kpi_id;
+END;
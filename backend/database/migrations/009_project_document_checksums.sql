@@ -0,0 +1,8 @@
+-- SHA-256 of uploaded project documents
+
+-- upload_document hashes the bytes while streaming them to disk, so the
+-- checksum is free to record; indexed per project so a repeated upload of the
+-- same file can be found without reading any files back
+ALTER TABLE project_documents ADD COLUMN content_sha256 TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_project_documents_sha256 ON project_documents(project_id, content_sha256);
@@ -0,0 +1,18 @@
+-- Ordering indexes for project, milestone and project transaction lists
+
+-- list_projects pages by created_at DESC, optionally filtered on status;
+-- walking these indexes backwards yields that order, so LIMIT stops early
+-- instead of sorting every matching project
+CREATE INDEX IF NOT EXISTS idx_projects_status_created ON projects(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at);
+
+-- list_milestones orders a project's milestones by due_date
+CREATE INDEX IF NOT EXISTS idx_milestones_project_due ON milestones(project_id, due_date);
+
+-- The project report lists a project's transactions by date DESC
+CREATE INDEX IF NOT EXISTS idx_tx_project_date ON transactions(project_id, date);
+
+-- Prefixes of the indexes above
+DROP INDEX IF EXISTS idx_projects_status;
+DROP INDEX IF EXISTS idx_milestones_project;
+DROP INDEX IF EXISTS idx_transactions_project;
@@ -0,0 +1,6 @@
+-- Drop the index duplicating the projects.code UNIQUE constraint
+
+-- code is declared UNIQUE, so SQLite already keeps an automatic index on it;
+-- create_project relies on that index to reject duplicates, and the extra
+-- plain index only added a second B-tree to update on every insert
+DROP INDEX IF EXISTS idx_projects_code;
@@ -16,17 +16,25 @@ print("OpenLedger Black - Login Fix")
 print("=" * 60)
 
 # Check if admin user exists
-cursor.execute("SELECT id, username, email FROM users WHERE username = 'admin'")
+cursor.execute("SELECT id, username, email, password_hash FROM users WHERE username = 'admin'")
 admin = cursor.fetchone()
 
 if admin:
     print(f"✅ Admin user exists: ID={admin[0]}, Username={admin[1]}, Email={admin[2]}")
     
-    # Update password to root1234
-    password_hash = bcrypt.hashpw(b'root1234', bcrypt.gensalt()).decode('utf-8')
-    cursor.execute("UPDATE users SET password_hash = ? WHERE username = 'admin'", (password_hash,))
-    conn.commit()
-    print("✅ Password reset to 'root1234'")
+    # Update password to root1234, unless it already is
+    try:
+        password_ok = bcrypt.checkpw(b'root1234', (admin[3] or '').encode('utf-8'))
+    except ValueError:  # Not a bcrypt hash
+        password_ok = False
+    
+    if password_ok:
+        print("✅ Password already set to 'root1234'")
+    else:
+        password_hash = bcrypt.hashpw(b'root1234', bcrypt.gensalt()).decode('utf-8')
+        cursor.execute("UPDATE users SET password_hash = ? WHERE username = 'admin'", (password_hash,))
+        conn.commit()
+        print("✅ Password reset to 'root1234'")
 else:
     print("❌ Admin user NOT found")
     print("Creating admin user...")
@@ -1,24 +1,31 @@
 """Simple batch script to remove all auth dependencies"""
 import re, glob
 
+# One alternation so each file is scanned once; group name -> replacement
+AUTH_PATTERN = re.compile(
+    r'(?P<imports>from auth import .+\n)'  # Replace auth imports
+    r'|(?P<depends>,\s*current_user:\s*UserResponse\s*=\s*Depends\([^)]+\))'  # Remove Depends with auth
+    r'|(?P<user_id>current_user\.id)'  # Replace current_user.id
+    r'|(?P<audit>\s*await log_audit\([^)]+\)\n)',  # Remove log_audit calls
+    re.MULTILINE
+)
+REPLACEMENTS = {
+    'imports': '# Auth removed\n',
+    'depends': '',
+    'user_id': '"system"',
+    'audit': '    # Audit removed\n',
+}
+
 for filepath in glob.glob('routes/*.py'):
     with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Replace auth imports
-    content = re.sub(r'from auth import .+\n', '# Auth removed\n', content)
-    
-    # Remove Depends with auth
-    content = re.sub(r',\s*current_user:\s*UserResponse\s*=\s*Depends\([^)]+\)', '', content, flags=re.MULTILINE)
-    
-    # Replace current_user.id
-    content = re.sub(r'current_user\.id', '"system"', content)
-    
-    # Remove log_audit calls
-    content = re.sub(r'\s*await log_audit\([^)]+\)\n', '    # Audit removed\n', content)
+        original = f.read()
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
+    content = AUTH_PATTERN.sub(lambda match: REPLACEMENTS[match.lastgroup], original)
     
-    print(f"[OK] {filepath}")
+    if content != original:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"[OK] {filepath}")
+    else:
+        print(f"[SKIP] {filepath} (unchanged)")
 print("Done")
@@ -0,0 +1,45 @@
+"""
+OpenLedger Hub - Gunicorn Configuration
+Loaded automatically by `gunicorn main:app` when started from backend/
+
+Workers are separate processes, so anything the app keeps in memory is
+per worker:
+- Cached results are only invalidated in the worker that handled the
+  write; other workers may serve them until their TTL expires: 60s for
+  the analytics router (/api/finance/analytics, /predict/cashflow,
+  /metrics/summary), 15s for finance period analytics, the impact
+  dashboard/heatmap and asset category names.
+- Upstream rate limits (e.g. Nominatim's 1 req/sec) are divided across the
+  workers via WORKER_PROCESSES, so the total stays within the policy.
+"""
+
+import multiprocessing
+import os
+
+# Route handlers serialize JSON on the event loop, so run one loop per core
+# (plus spare workers to cover requests blocked on SQLite's writer lock)
+workers = int(os.environ.get("UVICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# Inherited by the workers, which split per-host upstream rates by it
+os.environ["WORKER_PROCESSES"] = str(workers)
+
+# Access logs cost a formatted write per request; errors are still logged
+accesslog = None
+errorlog = "-"
+
+# Don't preload the app: each worker opens its own database connections
+# and HTTP client in the lifespan hook, after the fork
+preload_app = False
+
+
+def on_starting(server):
+    """
+    Create the schema and apply migrations once, in the master, before any
+    worker is forked; run concurrently from every worker's lifespan they
+    would race (ALTER TABLE, CREATE INDEX) and fail worker boot. The
+    workers' own init_db() then finds nothing to do.
+    """
+    from database import init_db
+    init_db()
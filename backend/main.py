@@ -3,13 +3,15 @@ OpenLedger Hub - Main FastAPI Application
 Open-access REST API for transparent finance & project tracking
 """
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 from config import settings
 from database import db, init_db
 from app.core.security import setup_cors, add_security_headers
+from app.services.external_apis import open_http_client, close_http_client
 
 
 # Initialize database on startup
@@ -18,7 +20,11 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     print("[Starting] OpenLedger Hub...")
-    init_db()
+    # Schema setup is blocking sqlite3 work, so run it off the event loop
+    # while the HTTP client opens; the DB pool needs the schema first.
+    # Under gunicorn the master has already run it (on_starting), so
+    # workers find nothing to apply and don't race on migrations
+    await asyncio.gather(asyncio.to_thread(init_db), open_http_client())
     await db.connect()
     print(f"[Database] Connected: {settings.database_path}")
     print(f"[CORS] Enabled for: {settings.cors_origins}")
@@ -27,6 +33,7 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    await close_http_client()
     await db.disconnect()
     print("[Shutdown] OpenLedger Hub")
 
@@ -38,6 +45,7 @@ app = FastAPI(
     description="Zero-cost, open-access finance & project intelligence platform for SMEs, NGOs, and community organizations",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
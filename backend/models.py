@@ -3,8 +3,8 @@ OpenLedger Black - Pydantic Models
 Type-safe data models for API requests and responses
 """
 
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, validator
+from typing import Any, Optional, List
 from datetime import date, datetime
 from enum import Enum
 
@@ -79,8 +79,7 @@ class UserResponse(UserBase):
     created_at: datetime
     last_login: Optional[datetime] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
@@ -124,8 +123,7 @@ class TransactionResponse(TransactionBase):
     category_name: Optional[str] = None
     project_name: Optional[str] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class BudgetBase(BaseModel):
@@ -147,8 +145,7 @@ class BudgetResponse(BudgetBase):
     created_by: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class BudgetItemCreate(BaseModel):
@@ -168,8 +165,7 @@ class BudgetItemResponse(BaseModel):
     variance: Optional[float] = None
     utilization_percentage: Optional[float] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CashflowSnapshot(BaseModel):
@@ -217,8 +213,7 @@ class ProjectResponse(ProjectBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class MilestoneBase(BaseModel):
@@ -248,8 +243,7 @@ class MilestoneResponse(MilestoneBase):
     completion_date: Optional[date] = None
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============================================================================
@@ -287,8 +281,7 @@ class AssetResponse(AssetBase):
     category_name: Optional[str] = None
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class MaintenanceLogCreate(BaseModel):
@@ -306,8 +299,7 @@ class MaintenanceLogResponse(MaintenanceLogCreate):
     id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============================================================================
@@ -336,8 +328,7 @@ class InventoryItemResponse(InventoryItemBase):
     is_low_stock: bool = False
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============================================================================
@@ -365,8 +356,7 @@ class KPIResponse(KPIBase):
     current_value: Optional[float] = None
     achievement_rate: Optional[float] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class KPIValueCreate(BaseModel):
@@ -382,8 +372,7 @@ class KPIValueResponse(KPIValueCreate):
     recorded_by: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class BeneficiaryBase(BaseModel):
@@ -406,8 +395,7 @@ class BeneficiaryResponse(BeneficiaryBase):
     status: str
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============================================================================
@@ -12,35 +12,31 @@ files = [
     'routes/impact.py'
 ]
 
+# One alternation so each file is scanned once; group name -> replacement
+AUTH_PATTERN = re.compile(
+    r'(?P<imports>from auth import .+\n)'  # Remove auth import line
+    # ,\n    current_user: UserResponse = Depends(create_permission_dependency(...))
+    r'|(?P<permission>,\s*\n\s*current_user:\s*UserResponse\s*=\s*Depends\(create_permission_dependency\([^)]+\)\))'
+    # ,\n    current_user: UserResponse = Depends(get_current_user)
+    r'|(?P<current_user>,\s*\n\s*current_user:\s*UserResponse\s*=\s*Depends\(get_current_user\))'
+    r'|(?P<audit>\s*await log_audit\([^)]+\)\n)'  # Remove log_audit calls
+    r'|(?P<user_id>current_user\.id)'  # Replace current_user.id with "system"
+)
+REPLACEMENTS = {
+    'imports': '# Auth removed - open access\n',
+    'permission': '',
+    'current_user': '',
+    'audit': '',
+    'user_id': '"system"',
+}
+
 for filepath in files:
     print(f"Processing {filepath}...")
     
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
     
-    # Remove auth import line
-    content = re.sub(r'from auth import .+\n', '# Auth removed - open access\n', content)
-    
-    #Remove Depends lines with auth
-    # Pattern 1: ,\n    current_user: UserResponse = Depends(create_permission_dependency(...))
-    content = re.sub(
-        r',\s*\n\s*current_user:\s*UserResponse\s*=\s*Depends\(create_permission_dependency\([^)]+\)\)',
-        '',
-        content
-    )
-    
-    # Pattern 2: current_user: UserResponse = Depends(get_current_user)
-    content = re.sub(
-        r',\s*\n\s*current_user:\s*UserResponse\s*=\s*Depends\(get_current_user\)',
-        '',
-        content
-    )
-    
-    # Remove log_audit calls
-    content = re.sub(r'\s*await log_audit\([^)]+\)\n', '', content)
-    
-    # Remove references to current_user.id (replace with "system")
-    content = re.sub(r'current_user\.id', '"system"', content)
+    content = AUTH_PATTERN.sub(lambda match: REPLACEMENTS[match.lastgroup], content)
     
     # Write back
     with open(filepath, 'w', encoding='utf-8') as f:
@@ -3,10 +3,16 @@ OpenLedger Black - Finance Engine Routes
 Transaction management, budgets, cashflow analytics - cold precision
 """
 
+import csv
+import io
+from collections import Counter, defaultdict
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 from database import Database, get_db
+from app.core.cache import ResultCache, bump_data_version
+from app.core.pagination import decode_cursor, encode_cursor
 from models import (
     TransactionCreate,
     TransactionResponse,
@@ -23,6 +29,29 @@ from models import (
 
 router = APIRouter()
 
+# Hot read endpoints select exactly the response model's fields, already in
+# their JSON form, and return ORJSONResponse so FastAPI skips response_model
+# validation and jsonable_encoder (as the asset routes do); response_model is
+# kept for the OpenAPI schema
+TRANSACTION_COLUMNS = """
+    t.transaction_type, t.category_id, CAST(t.amount AS REAL) as amount,
+    t.description, t.date, t.project_id, t.notes, t.id, t.reference_number,
+    strftime('%Y-%m-%dT%H:%M:%S', t.created_at) as created_at,
+    tc.name as category_name, p.name as project_name
+"""
+CASHFLOW_SNAPSHOT_COLUMNS = """
+    snapshot_date, CAST(opening_balance AS REAL) as opening_balance,
+    CAST(total_income AS REAL) as total_income,
+    CAST(total_expenses AS REAL) as total_expenses,
+    CAST(closing_balance AS REAL) as closing_balance,
+    CAST(burn_rate AS REAL) as burn_rate,
+    CAST(projection_30_days AS REAL) as projection_30_days
+"""
+
+# Period analytics are invalidated by the "analytics" version that
+# create_transaction bumps
+_FINANCE_CACHE = ResultCache("analytics", maxsize=64, ttl=15)
+
 
 @router.post("/transactions", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
@@ -31,40 +60,51 @@ async def create_transaction(
 ):
     """Record a new transaction - income, expense, disbursement, or transfer"""
     
-    # Generate reference number if not provided
-    ref_number = transaction.reference_number
-    if not ref_number:
-        count = await db.fetch_one("SELECT COUNT(*) as count FROM transactions")
-        ref_number = f"TXN-{datetime.now().strftime('%Y%m')}-{count['count'] + 1:04d}"
-    
-    # Insert transaction
-    cursor = await db.execute(
-        """
-        INSERT INTO transactions 
-        (transaction_type, category_id, amount, description, reference_number, 
-         date, project_id, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            transaction.transaction_type,
-            transaction.category_id,
-            transaction.amount,
-            transaction.description,
-            ref_number,
-            transaction.date,
-            transaction.project_id,
-            transaction.notes
+    # The insert and the project total commit together
+    async with db.transaction():
+        # Generate reference number if not provided
+        ref_number = transaction.reference_number
+        if not ref_number:
+            year_month = datetime.now().strftime('%Y%m')
+            counter = await db.execute_returning(
+                """
+                INSERT INTO ref_counters (year_month, next_val) VALUES (?, 1)
+                ON CONFLICT(year_month) DO UPDATE SET next_val = next_val + 1
+                RETURNING next_val
+                """,
+                (year_month,)
+            )
+            ref_number = f"TXN-{year_month}-{counter['next_val']:04d}"
+        
+        cursor = await db.execute(
+            """
+            INSERT INTO transactions 
+            (transaction_type, category_id, amount, description, reference_number, 
+             date, project_id, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                transaction.transaction_type,
+                transaction.category_id,
+                transaction.amount,
+                transaction.description,
+                ref_number,
+                transaction.date,
+                transaction.project_id,
+                transaction.notes
+            )
         )
-    )
-    await db.commit()
+        
+        # Update project spent amount if applicable
+        if transaction.project_id and transaction.transaction_type == "expense":
+            await db.execute(
+                "UPDATE projects SET spent_amount = COALESCE(spent_amount, 0) + ? WHERE id = ?",
+                (transaction.amount, transaction.project_id)
+            )
     
-    # Update project spent amount if applicable
-    if transaction.project_id and transaction.transaction_type == "expense":
-        await db.execute(
-            "UPDATE projects SET spent_amount = spent_amount + ? WHERE id = ?",
-            (transaction.amount, transaction.project_id)
-        )
-        await db.commit()
+    # Cached analytics and dashboard stats were computed without this transaction
+    bump_data_version("analytics")
+    bump_data_version("impact")
     
     # Log audit
     # Audit removed
@@ -84,6 +124,121 @@ async def create_transaction(
     return TransactionResponse(**created)
 
 
+@router.post("/transactions/bulk", status_code=status.HTTP_201_CREATED)
+async def create_transactions_bulk(
+    transactions: List[TransactionCreate],
+    db: Database = Depends(get_db)
+):
+    """Record several transactions in one transaction, e.g. for imports"""
+    
+    ref_numbers = [t.reference_number for t in transactions if t.reference_number]
+    duplicates = {ref for ref, count in Counter(ref_numbers).items() if count > 1}
+    if duplicates:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Reference numbers already exist or are repeated: {', '.join(sorted(duplicates))}"
+        )
+    
+    # Project spend rolled up so each project is updated once
+    project_deltas = defaultdict(float)
+    for t in transactions:
+        if t.project_id and t.transaction_type == "expense":
+            project_deltas[t.project_id] += t.amount
+    
+    async with db.transaction():
+        # Reserve one block of reference numbers for the rows without one
+        missing = len(transactions) - len(ref_numbers)
+        next_val = 0
+        if missing:
+            year_month = datetime.now().strftime('%Y%m')
+            counter = await db.execute_returning(
+                """
+                INSERT INTO ref_counters (year_month, next_val) VALUES (?, ?)
+                ON CONFLICT(year_month) DO UPDATE SET next_val = next_val + excluded.next_val
+                RETURNING next_val
+                """,
+                (year_month, missing)
+            )
+            next_val = counter['next_val'] - missing
+        
+        rows = []
+        for t in transactions:
+            ref_number = t.reference_number
+            if not ref_number:
+                next_val += 1
+                ref_number = f"TXN-{year_month}-{next_val:04d}"
+            rows.append((
+                t.transaction_type,
+                t.category_id,
+                t.amount,
+                t.description,
+                ref_number,
+                t.date,
+                t.project_id,
+                t.notes
+            ))
+        
+        # Checked on the writer under BEGIN IMMEDIATE, so no other request or
+        # process can take one of these numbers before the batch does; covers
+        # generated numbers clashing with client-supplied TXN-YYYYMM-NNNN ones.
+        # Raising rolls back the counter reservation too
+        all_refs = [row[4] for row in rows]
+        duplicates = {ref for ref, count in Counter(all_refs).items() if count > 1}
+        cursor = await db.execute(
+            f"SELECT reference_number FROM transactions WHERE reference_number IN ({', '.join('?' * len(all_refs))})",
+            tuple(all_refs)
+        )
+        duplicates.update(row['reference_number'] for row in await cursor.fetchall())
+        if duplicates:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Reference numbers already exist or are repeated: {', '.join(sorted(duplicates))}"
+            )
+        
+        await db.execute_many(
+            """
+            INSERT INTO transactions 
+            (transaction_type, category_id, amount, description, reference_number, 
+             date, project_id, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        
+        if project_deltas:
+            await db.execute_many(
+                "UPDATE projects SET spent_amount = COALESCE(spent_amount, 0) + ? WHERE id = ?",
+                [(delta, project_id) for project_id, delta in project_deltas.items()]
+            )
+    
+    bump_data_version("analytics")
+    bump_data_version("impact")
+    # Audit removed
+    
+    return ORJSONResponse({"inserted": len(transactions)}, status_code=status.HTTP_201_CREATED)
+
+
+# Query text for every combination of list_transactions filters, indexed by
+# a bitmask of the filters present, so each request reuses a constant SQL
+# string and hits the connection's prepared statement cache
+_TRANSACTION_FILTERS = (
+    "t.transaction_type = ?", "t.project_id = ?", "t.date >= ?", "t.date <= ?",
+    "(t.date, t.created_at, t.id) < (?, ?, ?)"
+)
+_LIST_TRANSACTIONS_SQL = {
+    mask: f"""
+        SELECT {TRANSACTION_COLUMNS}
+        FROM transactions t
+        LEFT JOIN transaction_categories tc ON t.category_id = tc.id
+        LEFT JOIN projects p ON t.project_id = p.id
+        WHERE {' AND '.join(['1=1'] + [c for i, c in enumerate(_TRANSACTION_FILTERS) if mask >> i & 1])}
+        ORDER BY t.date DESC, t.created_at DESC, t.id DESC
+        LIMIT ? OFFSET ?
+        """
+    for mask in range(1 << len(_TRANSACTION_FILTERS))
+}
+
+
 @router.get("/transactions", response_model=List[TransactionResponse])
 async def list_transactions(
     skip: int = Query(0, ge=0),
@@ -92,46 +247,34 @@ async def list_transactions(
     project_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
     db: Database = Depends(get_db)
 ):
-    """List transactions with filters and pagination"""
-    
-    # Build query with filters
-    conditions = ["1=1"]
-    params = []
-    
-    if transaction_type:
-        conditions.append("t.transaction_type = ?")
-        params.append(transaction_type)
+    """
+    List transactions with filters and pagination
     
-    if project_id:
-        conditions.append("t.project_id = ?")
-        params.append(project_id)
+    Full pages carry an X-Next-Cursor header; pass it back as cursor to seek
+    straight to the next page instead of skipping over the earlier ones.
+    """
     
-    if start_date:
-        conditions.append("t.date >= ?")
-        params.append(start_date)
+    after = None
+    if cursor:
+        after_date, created_at, after_id = decode_cursor(cursor, (date.fromisoformat, str, int))
+        # Rows carry the ISO form; the column stores SQLite's CURRENT_TIMESTAMP form
+        after = (after_date, created_at.replace("T", " "), after_id)
+        skip = 0
     
-    if end_date:
-        conditions.append("t.date <= ?")
-        params.append(end_date)
+    filters = (transaction_type, project_id, start_date, end_date, after)
+    mask = sum(1 << i for i, value in enumerate(filters) if value)
+    params = [value for value in filters[:-1] if value]
+    if after:
+        params.extend(after)
     
-    where_clause = " AND ".join(conditions)
+    transactions = await db.fetch_all(_LIST_TRANSACTIONS_SQL[mask], (*params, limit, skip))
     
-    transactions = await db.fetch_all(
-        f"""
-        SELECT t.*, tc.name as category_name, p.name as project_name
-        FROM transactions t
-        LEFT JOIN transaction_categories tc ON t.category_id = tc.id
-        LEFT JOIN projects p ON t.project_id = p.id
-        WHERE {where_clause}
-        ORDER BY t.date DESC, t.created_at DESC
-        LIMIT ? OFFSET ?
-        """,
-        (*params, limit, skip)
-    )
-    
-    return [TransactionResponse(**t) for t in transactions]
+    last = transactions[-1] if len(transactions) == limit else None
+    headers = {"X-Next-Cursor": encode_cursor(last['date'], last['created_at'], last['id'])} if last else None
+    return ORJSONResponse(transactions, headers=headers)
 
 
 @router.get("/budgets", response_model=List[BudgetResponse])
@@ -145,7 +288,7 @@ async def list_budgets(
         ORDER BY fiscal_year DESC, created_at DESC
         """
     )
-    return [BudgetResponse(**b) for b in budgets]
+    return budgets
 
 
 @router.post("/budgets", response_model=BudgetResponse, status_code=status.HTTP_201_CREATED)
@@ -154,22 +297,22 @@ async def create_budget(
     db: Database = Depends(get_db)
 ):
     """Create a new budget"""
-    cursor = await db.execute(
-        """
-        INSERT INTO budgets 
-        (name, description, fiscal_year, start_date, end_date, total_amount)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (
-            budget.name,
-            budget.description,
-            budget.fiscal_year,
-            budget.start_date,
-            budget.end_date,
-            budget.total_amount
+    async with db.transaction():
+        cursor = await db.execute(
+            """
+            INSERT INTO budgets 
+            (name, description, fiscal_year, start_date, end_date, total_amount)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                budget.name,
+                budget.description,
+                budget.fiscal_year,
+                budget.start_date,
+                budget.end_date,
+                budget.total_amount
+            )
         )
-    )
-    await db.commit()
     # Audit removed
     
     created = await db.fetch_one("SELECT * FROM budgets WHERE id = ?", (cursor.lastrowid,))
@@ -201,7 +344,20 @@ async def list_budget_items(
         (budget_id,)
     )
     
-    return [BudgetItemResponse(**item) for item in items]
+    return items
+
+
+# get_cashflow query text per combination of date filters, as above
+_CASHFLOW_FILTERS = ("snapshot_date >= ?", "snapshot_date <= ?")
+_CASHFLOW_SQL = {
+    mask: f"""
+        SELECT {CASHFLOW_SNAPSHOT_COLUMNS} FROM cashflow_snapshots
+        WHERE {' AND '.join(['1=1'] + [c for i, c in enumerate(_CASHFLOW_FILTERS) if mask >> i & 1])}
+        ORDER BY snapshot_date DESC
+        LIMIT 90
+        """
+    for mask in range(1 << len(_CASHFLOW_FILTERS))
+}
 
 
 @router.get("/cashflow", response_model=List[CashflowSnapshot])
@@ -212,39 +368,24 @@ async def get_cashflow(
 ):
     """Get cashflow snapshots over time"""
     
-    conditions = []
-    params = []
+    filters = (start_date, end_date)
+    mask = sum(1 << i for i, value in enumerate(filters) if value)
+    params = [value for value in filters if value]
     
-    if start_date:
-        conditions.append("snapshot_date >= ?")
-        params.append(start_date)
+    snapshots = await db.fetch_all(_CASHFLOW_SQL[mask], tuple(params))
     
-    if end_date:
-        conditions.append("snapshot_date <= ?")
-        params.append(end_date)
-    
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
-    
-    snapshots = await db.fetch_all(
-        f"""
-        SELECT * FROM cashflow_snapshots
-        WHERE {where_clause}
-        ORDER BY snapshot_date DESC
-        LIMIT 90
-        """,
-        tuple(params)
-    )
-    
-    return [CashflowSnapshot(**s) for s in snapshots]
+    return ORJSONResponse(snapshots)
 
 
-@router.get("/analytics", response_model=FinancialAnalytics)
+# Not /analytics: app.routes.analytics registers GET /api/finance/analytics
+# (summary metrics and predictions) ahead of this router, which shadowed it
+@router.get("/analytics/period", response_model=FinancialAnalytics)
 async def get_financial_analytics(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     db: Database = Depends(get_db)
 ):
-    """Get comprehensive financial analytics"""
+    """Get comprehensive financial analytics for a date range (default: last 90 days)"""
     
     # Default to last 90 days if not specified
     if not end_date:
@@ -252,82 +393,106 @@ async def get_financial_analytics(
     if not start_date:
         start_date = end_date - timedelta(days=90)
     
-    # Get totals
-    totals = await db.fetch_one(
-        """
-        SELECT 
-            COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END), 0) as total_income,
-            COALESCE(SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount ELSE 0 END), 0) as total_expenses
-        FROM transactions
-        WHERE date BETWEEN ? AND ?
-        """,
-        (start_date, end_date)
-    )
-    
-    # Calculate metrics
-    days_in_period = (end_date - start_date).days or 1
-    burn_rate = totals['total_expenses'] / days_in_period
+    async def compute():
+        # Totals, top expense categories and monthly trends in one round-trip:
+        # the period's rows are scanned once into the materialized CTE, and each
+        # result set is tagged with its kind (seq orders rows within a kind)
+        rows = await db.fetch_all(
+            """
+            WITH f AS MATERIALIZED (
+                SELECT transaction_type, amount, category_id, strftime('%Y-%m', date) as month
+                FROM transactions
+                WHERE date BETWEEN ? AND ?
+            )
+            SELECT 'total_income' as kind, NULL as label,
+                COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END), 0) as total,
+                0 as seq
+            FROM f
+            UNION ALL
+            SELECT 'total_expenses', NULL,
+                COALESCE(SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount ELSE 0 END), 0),
+                0
+            FROM f
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'top_expense' as kind, tc.name as label, SUM(f.amount) as total,
+                    ROW_NUMBER() OVER (ORDER BY SUM(f.amount) DESC) as seq
+                FROM f
+                LEFT JOIN transaction_categories tc ON f.category_id = tc.id
+                WHERE f.transaction_type IN ('expense', 'disbursement')
+                GROUP BY tc.id, tc.name
+            )
+            WHERE seq <= 5
+            UNION ALL
+            SELECT 'income_trend', month, SUM(amount), month
+            FROM f
+            WHERE transaction_type = 'income'
+            GROUP BY month
+            UNION ALL
+            SELECT 'expense_trend', month, SUM(amount), month
+            FROM f
+            WHERE transaction_type IN ('expense', 'disbursement')
+            GROUP BY month
+            ORDER BY kind, seq
+            """,
+            (start_date, end_date)
+        )
+        
+        totals = {}
+        top_expenses = []
+        income_trend = []
+        expense_trend = []
+        for row in rows:
+            kind = row['kind']
+            if kind == 'top_expense':
+                top_expenses.append({'name': row['label'], 'total': row['total']})
+            elif kind == 'income_trend':
+                income_trend.append({'month': row['label'], 'total': row['total']})
+            elif kind == 'expense_trend':
+                expense_trend.append({'month': row['label'], 'total': row['total']})
+            else:
+                totals[kind] = row['total']
+        
+        # Calculate metrics
+        days_in_period = (end_date - start_date).days or 1
+        burn_rate = totals['total_expenses'] / days_in_period
+        
+        return FinancialAnalytics(
+            period_start=start_date,
+            period_end=end_date,
+            total_income=totals['total_income'],
+            total_expenses=totals['total_expenses'],
+            net_position=totals['total_income'] - totals['total_expenses'],
+            burn_rate=burn_rate,
+            projection_30_days=burn_rate * 30,
+            projection_90_days=burn_rate * 90,
+            budget_variance=0,  # TODO: Calculate from budget
+            top_expense_categories=top_expenses,
+            income_trend=income_trend,
+            expense_trend=expense_trend
+        )
     
-    # Get top expense categories
-    top_expenses = await db.fetch_all(
-        """
-        SELECT 
-            tc.name,
-            SUM(t.amount) as total
+    return await _FINANCE_CACHE.get_or_compute(("analytics", start_date, end_date), compute)
+
+
+EXPORT_HEADER = (
+    "reference_number", "date", "transaction_type", "category", "amount",
+    "description", "project", "notes"
+)
+# export_transactions query text per combination of date filters, as above
+_EXPORT_FILTERS = ("t.date >= ?", "t.date <= ?")
+_EXPORT_TRANSACTIONS_SQL = {
+    mask: f"""
+        SELECT t.reference_number, t.date, t.transaction_type, tc.name, t.amount,
+            t.description, p.name, t.notes
         FROM transactions t
         LEFT JOIN transaction_categories tc ON t.category_id = tc.id
-        WHERE t.transaction_type IN ('expense', 'disbursement')
-          AND t.date BETWEEN ? AND ?
-        GROUP BY tc.id, tc.name
-        ORDER BY total DESC
-        LIMIT 5
-        """,
-        (start_date, end_date)
-    )
-    
-    # Get monthly trends
-    income_trend = await db.fetch_all(
-        """
-        SELECT 
-            strftime('%Y-%m', date) as month,
-            SUM(amount) as total
-        FROM transactions
-        WHERE transaction_type = 'income'
-          AND date BETWEEN ? AND ?
-        GROUP BY month
-        ORDER BY month
-        """,
-        (start_date, end_date)
-    )
-    
-    expense_trend = await db.fetch_all(
+        LEFT JOIN projects p ON t.project_id = p.id
+        WHERE {' AND '.join(['1=1'] + [c for i, c in enumerate(_EXPORT_FILTERS) if mask >> i & 1])}
+        ORDER BY t.date, t.id
         """
-        SELECT 
-            strftime('%Y-%m', date) as month,
-            SUM(amount) as total
-        FROM transactions
-        WHERE transaction_type IN ('expense', 'disbursement')
-          AND date BETWEEN ? AND ?
-        GROUP BY month
-        ORDER BY month
-        """,
-        (start_date, end_date)
-    )
-    
-    return FinancialAnalytics(
-        period_start=start_date,
-        period_end=end_date,
-        total_income=totals['total_income'],
-        total_expenses=totals['total_expenses'],
-        net_position=totals['total_income'] - totals['total_expenses'],
-        burn_rate=burn_rate,
-        projection_30_days=burn_rate * 30,
-        projection_90_days=burn_rate * 90,
-        budget_variance=0,  # TODO: Calculate from budget
-        top_expense_categories=[dict(e) for e in top_expenses],
-        income_trend=[dict(i) for i in income_trend],
-        expense_trend=[dict(e) for e in expense_trend]
-    )
+    for mask in range(1 << len(_EXPORT_FILTERS))
+}
 
 
 @router.get("/export")
@@ -339,12 +504,36 @@ async def export_transactions(
 ):
     """Export transactions to CSV or PDF"""
     
-    # TODO: Implement CSV/PDF export
-    # For now, return placeholder
+    if format == "pdf":
+        # TODO: Implement PDF export
+        return {
+            "message": "PDF export - to be implemented",
+            "format": format,
+            "start_date": start_date,
+            "end_date": end_date
+        }
+    
+    filters = (start_date, end_date)
+    mask = sum(1 << i for i, value in enumerate(filters) if value)
+    params = tuple(value for value in filters if value)
     
-    return {
-        "message": "Export functionality - to be implemented",
-        "format": format,
-        "start_date": start_date,
-        "end_date": end_date
-    }
+    async def generate():
+        # Rows are streamed off the cursor and flushed in ~64 KB chunks, so
+        # memory stays bounded however large the export is
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_HEADER)
+        async for row in db.iterate(_EXPORT_TRANSACTIONS_SQL[mask], params):
+            writer.writerow(tuple(row))
+            if buffer.tell() > 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    filename = f"transactions-{start_date or 'all'}-{end_date or 'all'}.csv"
+    return StreamingResponse(
+        generate(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
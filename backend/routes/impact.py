@@ -3,7 +3,10 @@ OpenLedger Black - Impact Metrics Routes
 KPI tracking, beneficiary management, impact reporting - PR + results proof machine
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import asyncio
+import aiosqlite
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
 from datetime import date
 from database import Database, get_db
@@ -17,11 +20,18 @@ from models import (
     DashboardStats,
     UserResponse
 )
+from app.core.cache import ResultCache, bump_data_version
+from app.core.pagination import decode_cursor, encode_cursor
 # Auth removed - open access
 
 
 router = APIRouter()
 
+# Dashboard reads are polled by every open client; KPI, beneficiary and
+# transaction writes bump the "impact" version, other writes show up within
+# the TTL
+_IMPACT_CACHE = ResultCache("impact", maxsize=8, ttl=15)
+
 
 # ============================================================================
 # KPI MANAGEMENT
@@ -34,23 +44,23 @@ async def create_kpi(
 ):
     """Create a custom KPI"""
     
-    cursor = await db.execute(
-        """
-        INSERT INTO kpis 
-        (category_id, name, description, measurement_unit, target_value, frequency, created_by)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            kpi.category_id,
-            kpi.name,
-            kpi.description,
-            kpi.measurement_unit,
-            kpi.target_value,
-            kpi.frequency,
-            "system"
+    async with db.transaction():
+        cursor = await db.execute(
+            """
+            INSERT INTO kpis 
+            (category_id, name, description, measurement_unit, target_value, frequency, created_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                kpi.category_id,
+                kpi.name,
+                kpi.description,
+                kpi.measurement_unit,
+                kpi.target_value,
+                kpi.frequency,
+                "system"
+            )
         )
-    )
-    await db.commit()
     # Audit removed
     
     created = await db.fetch_one(
@@ -63,11 +73,10 @@ async def create_kpi(
         (cursor.lastrowid,)
     )
     
-    created_dict = dict(created)
-    created_dict['current_value'] = None
-    created_dict['achievement_rate'] = None
+    created['current_value'] = None
+    created['achievement_rate'] = None
     
-    return KPIResponse(**created_dict)
+    return KPIResponse(**created)
 
 
 @router.get("/kpis", response_model=List[KPIResponse])
@@ -86,35 +95,28 @@ async def list_kpis(
     
     where_clause = " AND ".join(conditions) if conditions else "1=1"
     
+    # Totals and latest values are kept up to date by triggers on kpi_values
     kpis = await db.fetch_all(
         f"""
         SELECT 
             k.*,
             kc.name as category_name,
-            (
-                SELECT value 
-                FROM kpi_values 
-                WHERE kpi_id = k.id 
-                ORDER BY recorded_date DESC 
-                LIMIT 1
-            ) as current_value,
+            s.last_value as current_value,
             CASE 
                 WHEN k.target_value > 0 
-                THEN ROUND((
-                    (SELECT SUM(value) FROM kpi_values WHERE kpi_id = k.id) 
-                    * 100.0 / k.target_value
-                ), 2)
+                THEN ROUND(s.total * 100.0 / k.target_value, 2)
                 ELSE NULL
             END as achievement_rate
         FROM kpis k
         LEFT JOIN kpi_categories kc ON k.category_id = kc.id
+        LEFT JOIN kpi_stats s ON s.kpi_id = k.id
         WHERE {where_clause}
         ORDER BY k.created_at DESC
         """,
         tuple(params)
     )
     
-    return [KPIResponse(**kpi) for kpi in kpis]
+    return kpis
 
 
 @router.post("/kpis/{kpi_id}/record", response_model=KPIValueResponse, status_code=status.HTTP_201_CREATED)
@@ -125,37 +127,58 @@ async def record_kpi_value(
 ):
     """Record a value for a KPI"""
     
-    # Verify KPI exists
-    kpi = await db.fetch_one("SELECT id FROM kpis WHERE id = ?", (kpi_id,))
-    if not kpi:
-        raise HTTPException(status_code=404, detail="KPI not found")
-    
     # Verify kpi_id matches
     if value.kpi_id != kpi_id:
         raise HTTPException(status_code=400, detail="KPI ID mismatch")
     
-    cursor = await db.execute(
-        """
-        INSERT INTO kpi_values 
-        (kpi_id, value, recorded_date, project_id, notes, recorded_by)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (
-            value.kpi_id,
-            value.value,
-            value.recorded_date,
-            value.project_id,
-            value.notes,
-            "system"
-        )
-    )
-    await db.commit()
+    try:
+        async with db.transaction():
+            cursor = await db.execute(
+                """
+                INSERT INTO kpi_values 
+                (kpi_id, value, recorded_date, project_id, notes, recorded_by)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    value.kpi_id,
+                    value.value,
+                    value.recorded_date,
+                    value.project_id,
+                    value.notes,
+                    "system"
+                )
+            )
+    except aiosqlite.IntegrityError as e:
+        # The foreign keys verify the KPI (and project) exist, so there is no
+        # lookup before the insert; only a failed insert checks which was missing
+        if "FOREIGN KEY" not in str(e):
+            raise
+        kpi = await db.fetch_one("SELECT id FROM kpis WHERE id = ?", (kpi_id,))
+        if not kpi:
+            raise HTTPException(status_code=404, detail="KPI not found")
+        raise HTTPException(status_code=400, detail="Project not found")
+    
+    bump_data_version("impact")
     # Audit removed
     
     created = await db.fetch_one("SELECT * FROM kpi_values WHERE id = ?", (cursor.lastrowid,))
     return KPIValueResponse(**created)
 
 
+# Query text for every combination of optional filters, indexed by a bitmask
+# of the filters present, so each request reuses a constant SQL string and
+# hits the connection's prepared statement cache
+_KPI_VALUE_FILTERS = ("recorded_date >= ?", "recorded_date <= ?")
+_LIST_KPI_VALUES_SQL = {
+    mask: f"""
+        SELECT * FROM kpi_values
+        WHERE {' AND '.join(['kpi_id = ?'] + [c for i, c in enumerate(_KPI_VALUE_FILTERS) if mask >> i & 1])}
+        ORDER BY recorded_date DESC
+        """
+    for mask in range(1 << len(_KPI_VALUE_FILTERS))
+}
+
+
 @router.get("/kpis/{kpi_id}/values", response_model=List[KPIValueResponse])
 async def list_kpi_values(
     kpi_id: int,
@@ -165,29 +188,13 @@ async def list_kpi_values(
 ):
     """List recorded values for a KPI"""
     
-    conditions = ["kpi_id = ?"]
-    params = [kpi_id]
-    
-    if start_date:
-        conditions.append("recorded_date >= ?")
-        params.append(start_date)
-    
-    if end_date:
-        conditions.append("recorded_date <= ?")
-        params.append(end_date)
+    filters = (start_date, end_date)
+    mask = sum(1 << i for i, value in enumerate(filters) if value)
+    params = [value for value in filters if value]
     
-    where_clause = " AND ".join(conditions)
+    values = await db.fetch_all(_LIST_KPI_VALUES_SQL[mask], (kpi_id, *params))
     
-    values = await db.fetch_all(
-        f"""
-        SELECT * FROM kpi_values
-        WHERE {where_clause}
-        ORDER BY recorded_date DESC
-        """,
-        tuple(params)
-    )
-    
-    return [KPIValueResponse(**v) for v in values]
+    return values
 
 
 # ============================================================================
@@ -201,64 +208,78 @@ async def create_beneficiary(
 ):
     """Register a new beneficiary"""
     
-    cursor = await db.execute(
-        """
-        INSERT INTO beneficiaries 
-        (project_id, type, name, identifier, gender, age_group, location, registration_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            beneficiary.project_id,
-            beneficiary.type,
-            beneficiary.name,
-            beneficiary.identifier,
-            beneficiary.gender,
-            beneficiary.age_group,
-            beneficiary.location,
-            beneficiary.registration_date
+    async with db.transaction():
+        cursor = await db.execute(
+            """
+            INSERT INTO beneficiaries 
+            (project_id, type, name, identifier, gender, age_group, location, registration_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                beneficiary.project_id,
+                beneficiary.type,
+                beneficiary.name,
+                beneficiary.identifier,
+                beneficiary.gender,
+                beneficiary.age_group,
+                beneficiary.location,
+                beneficiary.registration_date
+            )
         )
-    )
-    await db.commit()
+    bump_data_version("impact")
     # Audit removed
     
     created = await db.fetch_one("SELECT * FROM beneficiaries WHERE id = ?", (cursor.lastrowid,))
     return BeneficiaryResponse(**created)
 
 
+# list_beneficiaries query text per combination of filters, as above
+_BENEFICIARY_FILTERS = ("project_id = ?", "status = ?", "(registration_date, id) < (?, ?)")
+_LIST_BENEFICIARIES_SQL = {
+    mask: f"""
+        SELECT * FROM beneficiaries
+        WHERE {' AND '.join(['1=1'] + [c for i, c in enumerate(_BENEFICIARY_FILTERS) if mask >> i & 1])}
+        ORDER BY registration_date DESC, id DESC
+        LIMIT ? OFFSET ?
+        """
+    for mask in range(1 << len(_BENEFICIARY_FILTERS))
+}
+
+
 @router.get("/beneficiaries", response_model=List[BeneficiaryResponse])
 async def list_beneficiaries(
+    response: Response,
     project_id: Optional[int] = None,
     status: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     db: Database = Depends(get_db)
 ):
-    """List beneficiaries with filters"""
-    
-    conditions = []
-    params = []
-    
-    if project_id:
-        conditions.append("project_id = ?")
-        params.append(project_id)
-    
-    if status:
-        conditions.append("status = ?")
-        params.append(status)
-    
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
-    
-    beneficiaries = await db.fetch_all(
-        f"""
-        SELECT * FROM beneficiaries
-        WHERE {where_clause}
-        ORDER BY registration_date DESC
-        LIMIT ? OFFSET ?
-        """,
-        (*params, limit, skip)
-    )
-    
-    return [BeneficiaryResponse(**b) for b in beneficiaries]
+    """
+    List beneficiaries with filters
+    
+    Full pages carry an X-Next-Cursor header; pass it back as cursor to seek
+    straight to the next page instead of skipping over the earlier ones.
+    """
+    
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, (date.fromisoformat, int))
+        skip = 0
+    
+    filters = (project_id, status, after)
+    mask = sum(1 << i for i, value in enumerate(filters) if value)
+    params = [value for value in filters[:-1] if value]
+    if after:
+        params.extend(after)
+    
+    beneficiaries = await db.fetch_all(_LIST_BENEFICIARIES_SQL[mask], (*params, limit, skip))
+    
+    if len(beneficiaries) == limit:
+        last = beneficiaries[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last['registration_date'], last['id'])
+    return beneficiaries
 
 
 # ============================================================================
@@ -271,83 +292,67 @@ async def get_dashboard_stats(
 ):
     """Get overall dashboard statistics"""
     
-    # Financial stats
-    financial = await db.fetch_one(
-        """
-        SELECT 
-            COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END), 0) as total_income,
-            COALESCE(SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount ELSE 0 END), 0) as total_expenses
-        FROM transactions
-        WHERE date >= date('now', '-30 days')
-        """
-    )
-    
-    # Get burn rate from latest cashflow snapshot
-    cashflow = await db.fetch_one(
-        """
-        SELECT burn_rate
-        FROM cashflow_snapshots
-        ORDER BY snapshot_date DESC
-        LIMIT 1
-        """
-    )
-    
-    # Project stats
-    projects = await db.fetch_one(
-        """
-        SELECT 
-            COUNT(*) as active_projects,
-            COALESCE(SUM(total_budget), 0) as total_budget,
-            COALESCE(SUM(spent_amount), 0) as budget_spent
-        FROM projects
-        WHERE status = 'active'
-        """
-    )
-    
-    # Low stock items
-    inventory = await db.fetch_one(
-        """
-        SELECT COUNT(*) as low_stock_items
-        FROM inventory_items
-        WHERE current_quantity <= minimum_quantity
-        """
-    )
-    
-    # Upcoming maintenance
-    maintenance = await db.fetch_one(
-        """
-        SELECT COUNT(*) as upcoming_maintenances
-        FROM maintenance_logs
-        WHERE next_maintenance_date BETWEEN date('now') AND date('now', '+30 days')
-        """
-    )
-    
-    # Total beneficiaries
-    beneficiaries = await db.fetch_one(
-        """
-        SELECT COUNT(*) as total_beneficiaries
-        FROM beneficiaries
-        WHERE status = 'active'
-        """
-    )
-    
-    budget_utilization = 0
-    if projects['total_budget'] > 0:
-        budget_utilization = round((projects['budget_spent'] / projects['total_budget']) * 100, 2)
+    async def compute():
+        # Every metric in one round-trip: each aggregate is a one-row derived
+        # table or scalar subquery over its own table
+        stats = await db.fetch_one(
+            """
+            SELECT
+                financial.total_income,
+                financial.total_expenses,
+                -- Burn rate from latest cashflow snapshot
+                COALESCE((
+                    SELECT burn_rate
+                    FROM cashflow_snapshots
+                    ORDER BY snapshot_date DESC
+                    LIMIT 1
+                ), 0) as burn_rate,
+                projects.active_projects,
+                projects.total_budget,
+                projects.budget_spent,
+                (
+                    SELECT COUNT(*)
+                    FROM inventory_items
+                    WHERE current_quantity <= minimum_quantity
+                ) as low_stock_items,
+                (
+                    SELECT COUNT(*)
+                    FROM maintenance_logs
+                    WHERE next_maintenance_date BETWEEN date('now') AND date('now', '+30 days')
+                ) as upcoming_maintenances,
+                (
+                    SELECT COUNT(*)
+                    FROM beneficiaries
+                    WHERE status = 'active'
+                ) as total_beneficiaries
+            FROM (
+                SELECT 
+                    COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END), 0) as total_income,
+                    COALESCE(SUM(CASE WHEN transaction_type IN ('expense', 'disbursement') THEN amount ELSE 0 END), 0) as total_expenses
+                FROM transactions
+                WHERE date >= date('now', '-30 days')
+            ) financial, (
+                SELECT 
+                    COUNT(*) as active_projects,
+                    COALESCE(SUM(total_budget), 0) as total_budget,
+                    COALESCE(SUM(spent_amount), 0) as budget_spent
+                FROM projects
+                WHERE status = 'active'
+            ) projects
+            """
+        )
+        
+        budget_utilization = 0
+        if stats['total_budget'] > 0:
+            budget_utilization = round((stats['budget_spent'] / stats['total_budget']) * 100, 2)
+        
+        return DashboardStats(
+            net_cashflow=stats['total_income'] - stats['total_expenses'],
+            budget_utilization=budget_utilization,
+            **stats
+        )
     
-    return DashboardStats(
-        total_income=financial['total_income'],
-        total_expenses=financial['total_expenses'],
-        net_cashflow=financial['total_income'] - financial['total_expenses'],
-        burn_rate=cashflow['burn_rate'] if cashflow else 0,
-        active_projects=projects['active_projects'],
-        total_budget=projects['total_budget'],
-        budget_spent=projects['budget_spent'],
-        budget_utilization=budget_utilization,
-        low_stock_items=inventory['low_stock_items'],
-        upcoming_maintenances=maintenance['upcoming_maintenances'] or 0,
-        total_beneficiaries=beneficiaries['total_beneficiaries']
-    )
+    return await _IMPACT_CACHE.get_or_compute(("dashboard",), compute)
 
 
 @router.get("/heatmap")
@@ -356,42 +361,49 @@ async def get_impact_heatmap(
 ):
     """Get impact heatmap data for visualization"""
     
-    # Get KPI achievements by category
-    kpi_data = await db.fetch_all(
-        """
-        SELECT 
-            kc.name as category,
-            COUNT(DISTINCT k.id) as kpi_count,
-            COUNT(kv.id) as total_records,
-            ROUND(AVG(
-                CASE 
-                    WHEN k.target_value > 0 
-                    THEN (kv.value * 100.0 / k.target_value)
-                    ELSE 100
-                END
-            ), 2) as avg_achievement
-        FROM kpi_categories kc
-        LEFT JOIN kpis k ON kc.id = k.category_id
-        LEFT JOIN kpi_values kv ON k.id = kv.kpi_id
-        GROUP BY kc.id, kc.name
-        ORDER BY avg_achievement DESC
-        """
-    )
-    
-    # Get beneficiaries by type
-    beneficiary_data = await db.fetch_all(
-        """
-        SELECT 
-            type,
-            COUNT(*) as count
-        FROM beneficiaries
-        WHERE status = 'active'
-        GROUP BY type
-        ORDER BY count DESC
-        """
-    )
-    
-    return {
-        "kpi_achievements": [dict(row) for row in kpi_data],
-        "beneficiary_distribution": [dict(row) for row in beneficiary_data]
-    }
+    async def compute():
+        # The two aggregates are independent, so they run concurrently on
+        # separate reader connections
+        kpi_data, beneficiary_data = await asyncio.gather(
+            # KPI achievements by category
+            db.fetch_all(
+                """
+                SELECT 
+                    kc.name as category,
+                    COUNT(DISTINCT k.id) as kpi_count,
+                    COUNT(kv.id) as total_records,
+                    ROUND(AVG(
+                        CASE 
+                            WHEN k.target_value > 0 
+                            THEN (kv.value * 100.0 / k.target_value)
+                            ELSE 100
+                        END
+                    ), 2) as avg_achievement
+                FROM kpi_categories kc
+                LEFT JOIN kpis k ON kc.id = k.category_id
+                LEFT JOIN kpi_values kv ON k.id = kv.kpi_id
+                GROUP BY kc.id, kc.name
+                ORDER BY avg_achievement DESC
+                """
+            ),
+            # Active beneficiaries by type
+            db.fetch_all(
+                """
+                SELECT 
+                    type,
+                    COUNT(*) as count
+                FROM beneficiaries
+                WHERE status = 'active'
+                GROUP BY type
+                ORDER BY count DESC
+                """
+            )
+        )
+        
+        return {
+            "kpi_achievements": kpi_data,
+            "beneficiary_distribution": beneficiary_data
+        }
+    
+    # Plain JSON types already, so skip jsonable_encoder
+    return ORJSONResponse(await _IMPACT_CACHE.get_or_compute(("heatmap",), compute))
@@ -3,7 +3,13 @@ OpenLedger Black - Projects Intelligence Routes
 Project management, milestones, deliverables - compliance officer in code
 """
 
+import asyncio
+import hashlib
+import aiosqlite
+import orjson
+import tempfile
 from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
 from database import Database, get_db
 from models import (
@@ -22,6 +28,16 @@ from config import settings
 
 router = APIRouter()
 
+# Row columns as returned to clients, for RETURNING clauses
+PROJECT_COLUMNS = """
+    *,
+    CASE 
+        WHEN total_budget > 0 
+        THEN ROUND((spent_amount * 100.0 / total_budget), 2)
+        ELSE 0
+    END as budget_utilization
+"""
+
 
 @router.post("", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
@@ -30,38 +46,46 @@ async def create_project(
 ):
     """Create a new project"""
     
-    # Check if code already exists
-    existing = await db.fetch_one("SELECT id FROM projects WHERE code = ?", (project.code,))
-    if existing:
+    try:
+        async with db.transaction():
+            created = await db.execute_returning(
+                f"""
+                INSERT INTO projects 
+                (name, code, description, start_date, end_date, total_budget, 
+                 donor_name, project_manager_name)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                RETURNING {PROJECT_COLUMNS}
+                """,
+                (
+                    project.name,
+                    project.code,
+                    project.description,
+                    project.start_date,
+                    project.end_date,
+                    project.total_budget,
+                    project.donor_name,
+                    "System Admin" # Default manager name since we removed auth
+                )
+            )
+    except aiosqlite.IntegrityError as e:
+        # The UNIQUE constraint on code decides, so a concurrent duplicate is caught too
+        if "projects.code" not in str(e):
+            raise
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Project code '{project.code}' already exists"
         )
-    
-    cursor = await db.execute(
-        """
-        INSERT INTO projects 
-        (name, code, description, start_date, end_date, total_budget, 
-         donor_name, project_manager_name)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            project.name,
-            project.code,
-            project.description,
-            project.start_date,
-            project.end_date,
-            project.total_budget,
-            project.donor_name,
-            "System Admin" # Default manager name since we removed auth
-        )
-    )
-    await db.commit()
     # Audit removed
     
-    # Fetch created project with manager name
-    created = await db.fetch_one(
-        """
+    return ProjectResponse(**created)
+
+
+# Query text for each combination of list_projects filters, indexed by a
+# bitmask of the filters present, so each request reuses a constant SQL
+# string and hits the connection's prepared statement cache
+_PROJECT_FILTERS = ("p.status = ?",)
+_LIST_PROJECTS_SQL = {
+    mask: f"""
         SELECT 
             p.*,
             CASE 
@@ -70,12 +94,12 @@ async def create_project(
                 ELSE 0
             END as budget_utilization
         FROM projects p
-        WHERE p.id = ?
-        """,
-        (cursor.lastrowid,)
-    )
-    
-    return ProjectResponse(**created)
+        WHERE {' AND '.join(['1=1'] + [c for i, c in enumerate(_PROJECT_FILTERS) if mask >> i & 1])}
+        ORDER BY p.created_at DESC
+        LIMIT ? OFFSET ?
+        """
+    for mask in range(1 << len(_PROJECT_FILTERS))
+}
 
 
 @router.get("", response_model=List[ProjectResponse])
@@ -87,33 +111,13 @@ async def list_projects(
 ):
     """List all projects with filters"""
     
-    conditions = []
-    params = []
-    
-    if status:
-        conditions.append("p.status = ?")
-        params.append(status)
-    
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    filters = (status,)
+    mask = sum(1 << i for i, value in enumerate(filters) if value)
+    params = [value for value in filters if value]
     
-    projects = await db.fetch_all(
-        f"""
-        SELECT 
-            p.*,
-            CASE 
-                WHEN p.total_budget > 0 
-                THEN ROUND((p.spent_amount * 100.0 / p.total_budget), 2)
-                ELSE 0
-            END as budget_utilization
-        FROM projects p
-        WHERE {where_clause}
-        ORDER BY p.created_at DESC
-        LIMIT ? OFFSET ?
-        """,
-        (*params, limit, skip)
-    )
+    projects = await db.fetch_all(_LIST_PROJECTS_SQL[mask], (*params, limit, skip))
     
-    return [ProjectResponse(**p) for p in projects]
+    return projects
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
@@ -181,15 +185,21 @@ async def update_project(
     
     params.append(project_id)
     
-    await db.execute(
-        f"UPDATE projects SET {', '.join(update_fields)} WHERE id = ?",
-        tuple(params)
-    )
-    await db.commit()
+    # RETURNING hands back the updated row, so there is no second SELECT
+    async with db.transaction():
+        updated = await db.execute_returning(
+            f"""
+            UPDATE projects SET {', '.join(update_fields)} WHERE id = ?
+            RETURNING {PROJECT_COLUMNS}
+            """,
+            tuple(params)
+        )
     # Audit removed
     
-    # Return updated project
-    return await get_project(project_id, db, current_user)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    return ProjectResponse(**updated)
 
 
 @router.post("/{project_id}/milestones", response_model=MilestoneResponse, status_code=status.HTTP_201_CREATED)
@@ -200,26 +210,29 @@ async def create_milestone(
 ):
     """Create a milestone for a project"""
     
-    # Verify project exists
-    project = await db.fetch_one("SELECT id FROM projects WHERE id = ?", (project_id,))
-    if not project:
+    try:
+        async with db.transaction():
+            cursor = await db.execute(
+                """
+                INSERT INTO milestones 
+                (project_id, name, description, due_date, completion_percentage)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    project_id,
+                    milestone.name,
+                    milestone.description,
+                    milestone.due_date,
+                    milestone.completion_percentage
+                )
+            )
+    except aiosqlite.IntegrityError as e:
+        # The project foreign key verifies the project exists, so there is no
+        # lookup before the insert
+        if "FOREIGN KEY" not in str(e):
+            raise
         raise HTTPException(status_code=404, detail="Project not found")
     
-    cursor = await db.execute(
-        """
-        INSERT INTO milestones 
-        (project_id, name, description, due_date, completion_percentage)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (
-            project_id,
-            milestone.name,
-            milestone.description,
-            milestone.due_date,
-            milestone.completion_percentage
-        )
-    )
-    await db.commit()
     # Audit removed
     
     created = await db.fetch_one("SELECT * FROM milestones WHERE id = ?", (cursor.lastrowid,))
@@ -242,7 +255,57 @@ async def list_milestones(
         (project_id,)
     )
     
-    return [MilestoneResponse(**m) for m in milestones]
+    return milestones
+
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Upload directories created (or found) by this process, so later uploads
+# to the same project skip the makedirs stat/mkdir calls
+_UPLOAD_DIRS = set()
+
+
+def _ensure_dir(path: str):
+    """Create path unless this process already has (blocking)"""
+    if path not in _UPLOAD_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _UPLOAD_DIRS.add(path)
+
+
+def _open_upload(project_dir: str):
+    """Open a temporary file in project_dir for an incoming upload (blocking)"""
+    _ensure_dir(project_dir)
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=project_dir, suffix=".part")
+    except FileNotFoundError:
+        # Removed since it was created; recreate it
+        _UPLOAD_DIRS.discard(project_dir)
+        _ensure_dir(project_dir)
+        fd, temp_path = tempfile.mkstemp(dir=project_dir, suffix=".part")
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _store_upload(temp_path: str, file_path: str):
+    """Move a finished upload to its content-addressed path (blocking)"""
+    hash_dir = os.path.dirname(file_path)
+    _ensure_dir(hash_dir)
+    # Same path means same bytes, so replacing an earlier copy is harmless
+    try:
+        os.replace(temp_path, file_path)
+    except FileNotFoundError:
+        if not os.path.exists(temp_path):
+            raise
+        _UPLOAD_DIRS.discard(hash_dir)
+        _ensure_dir(hash_dir)
+        os.replace(temp_path, file_path)
+
+
+def _discard_upload(temp_path: str):
+    """Remove a partial upload left by a failed request (blocking)"""
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
 
 
 @router.post("/{project_id}/upload")
@@ -260,42 +323,73 @@ async def upload_document(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Create project-specific upload directory
+    # Stream the file into a project-specific upload directory chunk by
+    # chunk, so memory stays bounded by the chunk size; disk I/O runs in a
+    # worker thread and the SHA-256 is computed on the way through
     project_dir = os.path.join(settings.UPLOAD_DIR, f"project_{project_id}")
-    os.makedirs(project_dir, exist_ok=True)
-    
-    # Save file
-    file_path = os.path.join(project_dir, file.filename)
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
-    
-    # Record in database
-    cursor = await db.execute(
-        """
-        INSERT INTO project_documents 
-        (project_id, document_type, file_name, file_path, file_size, uploaded_by, description)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            project_id,
-            document_type,
-            file.filename,
-            file_path,
-            len(content),
-            "system",
-            description
+    file_size = 0
+    hasher = hashlib.sha256()
+    f, temp_path = await asyncio.to_thread(_open_upload, project_dir)
+    try:
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                hasher.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        content_sha256 = hasher.hexdigest()
+        
+        # Stored under its hash rather than the client's filename, which is
+        # kept only in the database: no path traversal through the name, and
+        # the same file uploaded twice is one file on disk
+        file_path = os.path.join(project_dir, content_sha256[:2], content_sha256)
+        await asyncio.to_thread(_store_upload, temp_path, file_path)
+    except BaseException:
+        await asyncio.to_thread(_discard_upload, temp_path)
+        raise
+    
+    # Record in database, unless this project already has the same file
+    async with db.transaction():
+        cursor = await db.execute(
+            """
+            INSERT INTO project_documents 
+            (project_id, document_type, file_name, file_path, file_size, uploaded_by_name, description, content_sha256)
+            SELECT ?, ?, ?, ?, ?, ?, ?, ?
+            WHERE NOT EXISTS (
+                SELECT 1 FROM project_documents WHERE project_id = ? AND content_sha256 = ?
+            )
+            """,
+            (
+                project_id,
+                document_type,
+                file.filename,
+                file_path,
+                file_size,
+                "system",
+                description,
+                content_sha256,
+                project_id,
+                content_sha256
+            )
         )
-    )
-    await db.commit()
+        if cursor.rowcount:
+            document_id = cursor.lastrowid
+        else:
+            existing = await db.execute_returning(
+                "SELECT id FROM project_documents WHERE project_id = ? AND content_sha256 = ?",
+                (project_id, content_sha256)
+            )
+            document_id = existing["id"]
     # Audit removed
     
     return {
-        "message": "Document uploaded successfully",
+        "message": "Document uploaded successfully" if cursor.rowcount else "Document already uploaded",
         "file_name": file.filename,
-        "file_size": len(content),
-        "document_id": cursor.lastrowid
+        "file_size": file_size,
+        "content_sha256": content_sha256,
+        "document_id": document_id
     }
 
 
@@ -309,23 +403,44 @@ async def generate_project_report(
     # TODO: Implement comprehensive report generation
     # For now, return summary data
     
+    # One round-trip: milestone counts come from scalar subqueries and the
+    # transactions are aggregated by SQLite into a JSON array, which orjson
+    # parses in C instead of dict() per row
     project = await db.fetch_one(
         """
         SELECT 
             p.*,
-            u.full_name as project_manager_name,
             CASE 
                 WHEN p.total_budget > 0 
                 THEN ROUND((p.spent_amount * 100.0 / p.total_budget), 2)
                 ELSE 0
             END as budget_utilization,
-            COUNT(DISTINCT m.id) as total_milestones,
-            SUM(CASE WHEN m.status = 'completed' THEN 1 ELSE 0 END) as completed_milestones
+            (SELECT COUNT(*) FROM milestones m WHERE m.project_id = p.id) as total_milestones,
+            (
+                SELECT COUNT(*) FROM milestones m
+                WHERE m.project_id = p.id AND m.status = 'completed'
+            ) as completed_milestones,
+            (
+                SELECT json_group_array(json_object(
+                    'id', t.id, 'transaction_type', t.transaction_type,
+                    'category_id', t.category_id, 'amount', t.amount,
+                    'description', t.description, 'reference_number', t.reference_number,
+                    'date', t.date, 'project_id', t.project_id,
+                    'attachment_path', t.attachment_path, 'is_recurring', t.is_recurring,
+                    'recurring_frequency', t.recurring_frequency, 'notes', t.notes,
+                    'created_at', t.created_at, 'updated_at', t.updated_at,
+                    'month', t.month, 'category_name', t.category_name
+                ))
+                FROM (
+                    SELECT t.*, tc.name as category_name
+                    FROM transactions t
+                    LEFT JOIN transaction_categories tc ON t.category_id = tc.id
+                    WHERE t.project_id = p.id
+                    ORDER BY t.date DESC
+                ) t
+            ) as transactions
         FROM projects p
-        LEFT JOIN users u ON p.project_manager_id = u.id
-        LEFT JOIN milestones m ON m.project_id = p.id
         WHERE p.id = ?
-        GROUP BY p.id
         """,
         (project_id,)
     )
@@ -333,19 +448,12 @@ async def generate_project_report(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    transactions = await db.fetch_all(
-        """
-        SELECT t.*, tc.name as category_name
-        FROM transactions t
-        LEFT JOIN transaction_categories tc ON t.category_id = tc.id
-        WHERE t.project_id = ?
-        ORDER BY t.date DESC
-        """,
-        (project_id,)
-    )
+    transactions = orjson.loads(project.pop('transactions'))
     
-    return {
-        "project": dict(project),
-        "transactions": [dict(t) for t in transactions],
+    # Plain JSON types throughout, so orjson serializes the payload without
+    # a jsonable_encoder pass over every transaction
+    return ORJSONResponse({
+        "project": project,
+        "transactions": transactions,
         "message": "Full PDF report generation - to be implemented"
-    }
+    })
@@ -22,10 +22,13 @@ def init_database():
     print("OpenLedger Black - Database Initialization")
     print("=" * 60)
     
-    # Remove existing database if it exists
-    if os.path.exists(db_path):
-        print(f"🗑️  Removing existing database: {db_path}")
-        os.remove(db_path)
+    # Remove existing database if it exists, with the WAL and shared-memory
+    # files the app's WAL mode leaves next to it: a leftover WAL would be
+    # replayed onto the new file
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            print(f"🗑️  Removing existing database file: {path}")
+            os.remove(path)
     
     # Create database connection
     print(f"🔨 Creating new database: {db_path}")
@@ -33,22 +36,26 @@ def init_database():
     cursor = conn.cursor()
     
     try:
-        # Read and execute schema
+        # The file is brand new, so nothing is lost if the load fails midway:
+        # skip the journal and fsyncs while loading
+        cursor.execute("PRAGMA journal_mode = OFF")
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        
         print(f"📋 Loading schema from: {schema_path}")
         with open(schema_path, 'r', encoding='utf-8') as f:
             schema_sql = f.read()
-        cursor.executescript(schema_sql)
-        print("✅ Schema created successfully")
-        
-        # Read and execute seed data
         print(f"🌱 Loading seed data from: {seed_path}")
         with open(seed_path, 'r', encoding='utf-8') as f:
             seed_sql = f.read()
-        cursor.executescript(seed_sql)
-        print("✅ Seed data inserted successfully")
         
-        # Commit changes
-        conn.commit()
+        # Schema and seed load in one transaction, with a single commit
+        cursor.executescript(f"BEGIN;\n{schema_sql}\n;\n{seed_sql}\n;\nCOMMIT;")
+        print("✅ Schema created and seed data inserted successfully")
+        
+        # Back to the settings the application runs with
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
         
         # Verify database
         cursor.execute("SELECT COUNT(*) FROM projects")
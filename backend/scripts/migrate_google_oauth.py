@@ -35,9 +35,11 @@ def migrate_database():
         migrations_needed = []
         
         # Check each column
+        # ALTER TABLE cannot add a UNIQUE column; uniqueness comes from the
+        # unique index created below instead
         if 'google_sub' not in columns:
             migrations_needed.append(
-                "ALTER TABLE users ADD COLUMN google_sub VARCHAR(255) UNIQUE"
+                "ALTER TABLE users ADD COLUMN google_sub VARCHAR(255)"
             )
         
         if 'google_picture' not in columns:
@@ -59,17 +61,17 @@ def migrate_database():
             print("✅ Database already up to date. No migrations needed.")
             return
         
-        # Execute migrations
+        # Execute migrations in one transaction: sqlite3 would otherwise
+        # autocommit each ALTER TABLE, and a failure would leave the table half
+        # migrated. Adding a column only rewrites the schema entry, not the rows.
+        cursor.execute("BEGIN IMMEDIATE")
         for i, migration in enumerate(migrations_needed, 1):
             print(f"   [{i}/{len(migrations_needed)}] Executing: {migration}")
             cursor.execute(migration)
         
-        # Create index on google_sub for fast lookups
-        try:
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_google_sub ON users(google_sub)")
-            print("   [+] Created index on google_sub")
-        except sqlite3.OperationalError:
-            print("   [i] Index already exists")
+        # Unique index on google_sub for fast lookups
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_google_sub ON users(google_sub)")
+        print("   [+] Created unique index on google_sub")
         
         # Commit changes
         conn.commit()
@@ -27,4 +27,4 @@ echo "✅ Starting FastAPI server on http://localhost:8000"
 echo "📚 API Documentation: http://localhost:8000/docs"
 echo ""
 
-uvicorn main:app --reload --host 0.0.0.0 --port 8000
+uvicorn main:app --reload --host 0.0.0.0 --port 8000 --loop uvloop --http httptools